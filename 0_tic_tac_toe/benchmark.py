@@ -0,0 +1,323 @@
+"""
+Benchmarks for the tictactoe search engine.
+
+Usage: python benchmark.py parallel [--workers N] [BOARD ...]
+       python benchmark.py mcts [--board BOARD] [--games N] [BUDGET ...]
+       python benchmark.py stats [--time-budget SECONDS] [BOARD ...]
+       python benchmark.py alloc [--repeats N] [BOARD ...]
+
+BOARD is ROWSxCOLS:K or ROWSxCOLS:K:DEPTH, e.g. 5x5:4:4 for a 5x5 board,
+4 in a row, searched 4 plies deep. BUDGET is seconds per move.
+
+The alloc benchmark runs the search as it was before best moves were
+tracked as scalars against the current one. Both free nearly everything
+they allocate through reference counting, so neither sets off a gen 0
+collection at the default threshold; with the threshold lowered to
+ALLOC_THRESHOLD the count shows how many objects each keeps alive
+at once. Times are the best of N runs after a warm-up.
+"""
+
+import argparse
+import gc
+import os
+import random
+import time
+import tracemalloc
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import selfplay
+import tictactoe as ttt
+
+DEFAULT_BOARDS = ["4x4:3", "5x5:4:4", "6x6:4:4", "7x7:5:3"]
+DEFAULT_BUDGETS = [0.05, 0.1, 0.2]
+ALLOC_BOARDS = ["3x3:3", "4x4:3:6", "5x5:4:4", "5x5:4:5"]
+ALLOC_THRESHOLD = 10
+
+BoardSpec = Tuple[int, int, int, Optional[int]]
+
+
+def parse_board(spec: str) -> BoardSpec:
+    """
+    Parses a ROWSxCOLS:K[:DEPTH] board specification.
+    """
+    try:
+        shape, k, *depth = spec.split(":")
+        rows, cols = shape.lower().split("x")
+        return int(rows), int(cols), int(k), int(depth[0]) if depth else None
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid board {spec!r}, expected ROWSxCOLS:K[:DEPTH]")
+
+
+def timed(search: Callable[[], Optional[ttt.Action]]) -> Tuple[Optional[ttt.Action], float]:
+    start = time.perf_counter()
+    action = search()
+    return action, time.perf_counter() - start
+
+
+def bench_parallel(args):
+    workers = args.workers or os.cpu_count()
+    print(f"Root-splitting search with {workers} worker processes")
+    print(f"{'board':>10} {'serial s':>10} {'parallel s':>11} {'speedup':>8}  moves")
+    for rows, cols, k, depth in args.boards:
+        board = ttt.initial_state(rows, cols)
+        serial, serial_time = timed(lambda: ttt.minimax(board, k, depth))
+        parallel, parallel_time = timed(
+            lambda: ttt.parallel_minimax(board, k, depth, workers=workers))
+        name = f"{rows}x{cols}:{k}" + (f":{depth}" if depth else "")
+        print(f"{name:>10} {serial_time:>10.2f} {parallel_time:>11.2f} "
+              f"{serial_time / parallel_time:>7.2f}x  {serial} {parallel}")
+
+
+def bench_mcts(args):
+    rows, cols, k, _ = args.board
+    print(f"MCTS vs alpha-beta iterative deepening, {args.games} games per budget "
+          f"on {rows}x{cols}, {k} in a row")
+    print(f"{'budget s':>9} {'engine':>16} {'W':>4} {'D':>4} {'L':>4} {'score':>6} "
+          f"{'cpu s':>8} {'score/cpu s':>12}")
+    rng = random.Random(args.seed)
+    for budget in args.budgets:
+        engines = [selfplay.make_engine(f"{args.mcts}:{budget}", rng),
+                   selfplay.make_engine(f"id:{budget}", rng)]
+        selfplay.tournament(*engines, args.games, rows, cols, k, args.opening, rng)
+        for engine in engines:
+            score = (engine.wins + engine.draws / 2) / args.games
+            print(f"{budget:>9} {engine.name:>16} {engine.wins:>4} {engine.draws:>4} "
+                  f"{engine.losses:>4} {score:>6.2f} {engine.cpu_time:>8.2f} "
+                  f"{score / engine.cpu_time if engine.cpu_time else 0:>12.3f}")
+
+
+def bench_stats(args):
+    for rows, cols, k, depth in args.boards:
+        board = ttt.initial_state(rows, cols)
+        action, stats = ttt.analyze(board, k, depth, args.time_budget)
+        name = f"{rows}x{cols}:{k}" + (f":{depth}" if depth else "")
+        print(f"{name}: best move {action}")
+        print(stats)
+
+
+class LegacyValuedAction:
+    """
+    The search result object as it was before ValuedAction had slots.
+    """
+
+    def __init__(self, init_value: float, action: Optional[ttt.Action] = None,
+                 line: Optional[List[ttt.Action]] = None):
+        self.value = init_value
+        self.action = action
+        self.line = line or []
+
+    def __lt__(self, other: "LegacyValuedAction"):
+        return self.value < other.value
+
+    def __gt__(self, other: "LegacyValuedAction"):
+        return self.value > other.value
+
+
+# The alpha-beta search as it was before best moves were tracked as scalars,
+# kept as it stood so that bench_alloc compares against the real thing: a
+# result object and best line per node, and a sliced principal variation
+# per child. It shares Position and leaf_score with the current search.
+
+def legacy_ordered_actions(acts: Iterable[ttt.Action], pv: Optional[List[ttt.Action]],
+                           hint: Optional[ttt.Action] = None) -> List[ttt.Action]:
+    acts = list(acts)
+    first = pv[0] if pv else hint
+    if first in acts:
+        acts.remove(first)
+        acts.insert(0, first)
+    return acts
+
+
+def legacy_probe(key: ttt.BoardKey, depth: int, ctx: ttt.SearchContext, alpha: float,
+                 beta: float) -> Tuple[Optional[ttt.TableEntry], float, float]:
+    if ctx.table is None:
+        return None, alpha, beta
+    entry = ctx.table.get(key)
+    if entry is None or entry.draft < ctx.draft(depth):
+        ctx.stats.table_misses += 1
+        return entry, alpha, beta
+    ctx.stats.table_hits += 1
+    if abs(entry.value) < 1 and entry.draft < ctx.root_empties - depth:
+        ctx.cut_off = True
+    if entry.flag == ttt.EXACT:
+        return entry, entry.value, entry.value
+    if depth == 0:
+        return entry, alpha, beta
+    if entry.flag == ttt.LOWER:
+        return entry, max(alpha, entry.value), beta
+    return entry, alpha, min(beta, entry.value)
+
+
+def legacy_store(key: ttt.BoardKey, depth: int, ctx: ttt.SearchContext,
+                 best: LegacyValuedAction, alpha: float, beta: float):
+    if ctx.table is None:
+        return
+    flag = ttt.LOWER if best.value >= beta else ttt.UPPER if best.value <= alpha else ttt.EXACT
+    ctx.table[key] = ttt.TableEntry(ctx.draft(depth), flag, best.value, best.action)
+
+
+def legacy_max_value(pos: ttt.Position, depth: int, ctx: ttt.SearchContext,
+                     alpha: float = ttt.INT_MIN, beta: float = ttt.INT_MAX,
+                     pv: Optional[List[ttt.Action]] = None) -> LegacyValuedAction:
+    score = ttt.leaf_score(pos, depth, ctx)
+    if score is not None:
+        return LegacyValuedAction(score, None)
+    key = pos.key
+    entry, lo, hi = legacy_probe(key, depth, ctx, alpha, beta)
+    if lo >= hi:
+        return LegacyValuedAction(entry.value, entry.action, [entry.action])
+    best = LegacyValuedAction(ttt.INT_MIN, None)
+    a = lo
+    for action in legacy_ordered_actions(pos.actions(), pv, entry.action if entry else None):
+        child_pv = pv[1:] if pv and action == pv[0] else None
+        pos.make(action)
+        start = time.perf_counter() if depth == 0 else 0.0
+        child = legacy_min_value(pos, depth + 1, ctx, a, hi, child_pv)
+        if depth == 0:
+            ctx.stats.root_times[action] = (ctx.stats.root_times.get(action, 0.0)
+                                            + time.perf_counter() - start)
+        pos.unmake(action)
+        if child > best:
+            best = LegacyValuedAction(child.value, action, [action] + child.line)
+        a = max(a, child.value)
+        if a >= hi:
+            ctx.stats.cutoffs += 1
+            break
+    legacy_store(key, depth, ctx, best, lo, hi)
+    return best
+
+
+def legacy_min_value(pos: ttt.Position, depth: int, ctx: ttt.SearchContext,
+                     alpha: float = ttt.INT_MIN, beta: float = ttt.INT_MAX,
+                     pv: Optional[List[ttt.Action]] = None) -> LegacyValuedAction:
+    score = ttt.leaf_score(pos, depth, ctx)
+    if score is not None:
+        return LegacyValuedAction(score, None)
+    key = pos.key
+    entry, lo, hi = legacy_probe(key, depth, ctx, alpha, beta)
+    if lo >= hi:
+        return LegacyValuedAction(entry.value, entry.action, [entry.action])
+    best = LegacyValuedAction(ttt.INT_MAX, None)
+    b = hi
+    for action in legacy_ordered_actions(pos.actions(), pv, entry.action if entry else None):
+        child_pv = pv[1:] if pv and action == pv[0] else None
+        pos.make(action)
+        start = time.perf_counter() if depth == 0 else 0.0
+        child = legacy_max_value(pos, depth + 1, ctx, lo, b, child_pv)
+        if depth == 0:
+            ctx.stats.root_times[action] = (ctx.stats.root_times.get(action, 0.0)
+                                            + time.perf_counter() - start)
+        pos.unmake(action)
+        if child < best:
+            best = LegacyValuedAction(child.value, action, [action] + child.line)
+        b = min(b, child.value)
+        if lo >= b:
+            ctx.stats.cutoffs += 1
+            break
+    legacy_store(key, depth, ctx, best, lo, hi)
+    return best
+
+
+def gc_collections(search: Callable[[], object], threshold: int) -> int:
+    """
+    Returns the gen 0 garbage collections a search sets off with the gen 0
+    threshold at `threshold`.
+    """
+    collections = 0
+
+    def count(phase, info):
+        nonlocal collections
+        if phase == "start" and info["generation"] == 0:
+            collections += 1
+
+    old_threshold = gc.get_threshold()
+    gc.collect()
+    gc.callbacks.append(count)
+    gc.set_threshold(threshold, *old_threshold[1:])
+    try:
+        search()
+    finally:
+        gc.set_threshold(*old_threshold)
+        gc.callbacks.remove(count)
+    return collections
+
+
+def measure(search: Callable[[], object], repeats: int) -> Tuple[float, int, int, int]:
+    """
+    Returns a search's best seconds of `repeats` runs, the gen 0 garbage
+    collections it sets off at the default threshold and at ALLOC_THRESHOLD,
+    and its peak traced memory in bytes.
+    """
+    search()  # warm up the caches of line geometry and Zobrist keys
+    seconds = min(timed(search)[1] for _ in range(repeats))
+    default = gc_collections(search, gc.get_threshold()[0])
+    low = gc_collections(search, ALLOC_THRESHOLD)
+    tracemalloc.start()
+    search()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, default, low, peak
+
+
+def bench_alloc(args):
+    print("Allocation per search, without a transposition table, the search "
+          "before and after best-move tracking with scalars")
+    print(f"{'board':>10} {'search':>8} {'seconds':>9} {'gen0 GCs':>9} "
+          f"{f'at {ALLOC_THRESHOLD}':>9} {'peak KiB':>9}")
+    for rows, cols, k, depth in args.boards:
+        board = ttt.initial_state(rows, cols)
+        searches = {
+            "legacy": lambda: legacy_max_value(ttt.Position(board, k), 0,
+                                               ttt.SearchContext(board, k, depth)),
+            "scalar": lambda: ttt.search_max(ttt.Position(board, k), 0,
+                                             ttt.SearchContext(board, k, depth),
+                                             ttt.INT_MIN, ttt.INT_MAX, None),
+        }
+        name = f"{rows}x{cols}:{k}" + (f":{depth}" if depth else "")
+        for label, search in searches.items():
+            seconds, default, low, peak = measure(search, args.repeats)
+            print(f"{name:>10} {label:>8} {seconds:>9.3f} {default:>9} {low:>9} "
+                  f"{peak / 1024:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parallel = commands.add_parser("parallel", help="serial vs parallel root-splitting search")
+    parallel.add_argument("--workers", type=int, default=None,
+                          help="worker processes (default: CPU count)")
+    parallel.add_argument("boards", nargs="*", type=parse_board,
+                          default=[parse_board(spec) for spec in DEFAULT_BOARDS])
+    parallel.set_defaults(run=bench_parallel)
+
+    versus = commands.add_parser("mcts", help="MCTS vs alpha-beta at equal time per move")
+    versus.add_argument("--board", type=parse_board, default=parse_board("6x6:4"))
+    versus.add_argument("--games", type=int, default=20)
+    versus.add_argument("--opening", type=int, default=2,
+                        help="random plies at the start of each game")
+    versus.add_argument("--mcts", choices=["mcts", "mcts-greedy"], default="mcts-greedy",
+                        help="playout policy")
+    versus.add_argument("--seed", type=int, default=None)
+    versus.add_argument("budgets", nargs="*", type=float, default=DEFAULT_BUDGETS)
+    versus.set_defaults(run=bench_mcts)
+
+    stats = commands.add_parser("stats", help="search statistics for an empty board")
+    stats.add_argument("--time-budget", type=float, default=None,
+                       help="search by iterative deepening for this many seconds")
+    stats.add_argument("boards", nargs="*", type=parse_board,
+                       default=[parse_board(spec) for spec in DEFAULT_BOARDS])
+    stats.set_defaults(run=bench_stats)
+
+    alloc = commands.add_parser("alloc", help="allocation and GC cost of the search")
+    alloc.add_argument("--repeats", type=int, default=3, help="timed runs per search")
+    alloc.add_argument("boards", nargs="*", type=parse_board,
+                       default=[parse_board(spec) for spec in ALLOC_BOARDS])
+    alloc.set_defaults(run=bench_alloc)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Monte Carlo Tree Search player for tictactoe boards of any size.
+
+Where minimax needs to see (or estimate) every line of play, MCTS grows
+a tree toward the moves that win most often in random playouts, which
+scales to large m,n,k boards.
+"""
+
+import math
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+import tictactoe as ttt
+from tictactoe import Action, Board
+
+# UCT exploration constant; sqrt(2) suits rewards in [0, 1]
+EXPLORATION = math.sqrt(2)
+
+# Iterations per search when neither a count nor a time budget is given
+DEFAULT_ITERATIONS = 1000
+
+# Plies below the previous root searched for the current board (our move
+# plus the opponent's reply) when reusing the tree
+REUSE_PLIES = 2
+
+Playout = Callable[[Board, int, random.Random, ttt.SearchStats], Optional[str]]
+
+
+def random_playout(board: Board, k: int, rng: random.Random,
+                   stats: ttt.SearchStats) -> Optional[str]:
+    """
+    Plays uniformly random moves to the end of the game and returns the
+    winner, or None for a draw.
+    """
+    pos = ttt.Position(board, k)
+    empties = list(pos.actions())
+    rng.shuffle(empties)
+    for action in empties:
+        if pos.winner() is not None:
+            break
+        pos.make(action)
+        stats.nodes += 1
+    return pos.winner()
+
+
+def greedy_playout(board: Board, k: int, rng: random.Random,
+                   stats: ttt.SearchStats) -> Optional[str]:
+    """
+    Like random_playout, but completes a k-in-a-row whenever it can,
+    which makes playouts on large boards far less noisy.
+    """
+    pos = ttt.Position(board, k)
+    lines, _ = ttt.line_geometry(pos.rows, pos.cols, k)
+    while pos.winner() is None and not pos.is_full():
+        own = pos.counts[pos.turn]
+        other = pos.counts[ttt.O if pos.turn == ttt.X else ttt.X]
+        action = None
+        for index, line in enumerate(lines):
+            if own[index] == k - 1 and not other[index]:
+                action = next(cell for cell in line if pos.board[cell[0]][cell[1]] == ttt.EMPTY)
+                break
+        if action is None:
+            action = rng.choice(list(pos.actions()))
+        pos.make(action)
+        stats.nodes += 1
+    return pos.winner()
+
+
+class Node:
+    """
+    A position in the search tree, with playout results from the point
+    of view of the player who moved into it.
+    """
+
+    def __init__(self, board: Board, k: int, parent: Optional["Node"] = None,
+                 action: Optional[Action] = None):
+        self.board = board
+        self.parent = parent
+        self.action = action
+        self.mover = None if parent is None else ttt.player(parent.board)
+        self.children: Dict[Action, Node] = {}
+        self.terminal = ttt.terminal(board, k)
+        self.untried: List[Action] = [] if self.terminal else sorted(ttt.actions(board))
+        self.visits = 0
+        self.reward = 0.0
+
+    def uct_child(self, exploration: float) -> "Node":
+        log_visits = math.log(self.visits)
+        return max(self.children.values(),
+                   key=lambda child: (child.reward / child.visits
+                                      + exploration * math.sqrt(log_visits / child.visits)))
+
+
+class MCTS:
+    """
+    UCT search that keeps its tree between consecutive moves of a game.
+    """
+
+    def __init__(self, k: int = ttt.K, exploration: float = EXPLORATION,
+                 playout: Playout = random_playout, rng: Optional[random.Random] = None):
+        self.k = k
+        self.exploration = exploration
+        self.playout = playout
+        self.rng = rng or random.Random()
+        self.root: Optional[Node] = None
+        self.iterations = 0  # run by the last search
+
+    def find_root(self, board: Board) -> Node:
+        """
+        Returns the node for `board`, reusing the previous search's subtree
+        when the board was reached from its root, else a fresh node.
+        """
+        key = ttt.board_key(board)
+        frontier = [self.root] if self.root else []
+        for _ in range(REUSE_PLIES + 1):
+            for node in frontier:
+                if ttt.board_key(node.board) == key and node.board == board:
+                    node.parent = None
+                    return node
+            frontier = [child for node in frontier for child in node.children.values()]
+        return Node(board, self.k)
+
+    def search(self, board: Board, iterations: Optional[int] = None,
+               time_budget: Optional[float] = None,
+               stats: Optional[ttt.SearchStats] = None) -> Optional[Action]:
+        """
+        Returns the most visited action after `iterations` playouts or
+        `time_budget` seconds, whichever comes first.
+        """
+        if ttt.terminal(board, self.k):
+            return None
+        if iterations is None and time_budget is None:
+            iterations = DEFAULT_ITERATIONS
+        stats = ttt.SearchStats() if stats is None else stats
+        deadline = None if time_budget is None else time.monotonic() + time_budget
+        self.root = self.find_root(board)
+        self.iterations = 0
+        while iterations is None or self.iterations < iterations:
+            # Always run one iteration so the root has a child to pick
+            if deadline is not None and self.iterations and time.monotonic() > deadline:
+                break
+            self.iterate(stats)
+            self.iterations += 1
+        best = max(self.root.children.values(), key=lambda child: child.visits)
+        return best.action
+
+    def iterate(self, stats: ttt.SearchStats):
+        """
+        Runs one select, expand, playout and backpropagate step.
+        """
+        node = self.root
+        while not node.untried and not node.terminal:
+            node = node.uct_child(self.exploration)
+            stats.nodes += 1
+        if node.untried:
+            action = node.untried.pop(self.rng.randrange(len(node.untried)))
+            child = Node(ttt.result(node.board, action), self.k, node, action)
+            node.children[action] = child
+            node = child
+            stats.nodes += 1
+        if node.terminal:
+            champ = ttt.winner(node.board, self.k)
+        else:
+            champ = self.playout(node.board, self.k, self.rng, stats)
+        while node is not None:
+            node.visits += 1
+            if node.mover is not None:
+                node.reward += 1.0 if champ == node.mover else 0.5 if champ is None else 0.0
+            node = node.parent
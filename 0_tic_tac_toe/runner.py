@@ -1,9 +1,22 @@
 import pygame
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import tictactoe as ttt
 
+# Board shape and win length; see tictactoe.ROWS, COLS and K
+ROWS = ttt.ROWS
+COLS = ttt.COLS
+K = ttt.K
+
+# Seconds the computer may think about each move
+TIME_BUDGET = 2.0
+
+# Frames drawn per second, also while the computer is thinking
+FPS = 60
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -12,20 +25,29 @@ black = (0, 0, 0)
 white = (255, 255, 255)
 
 screen = pygame.display.set_mode(size)
+clock = pygame.time.Clock()
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
 moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 
 user = None
-board = ttt.initial_state()
-ai_turn = False
+board = ttt.initial_state(ROWS, COLS)
+
+# The computer searches on a worker thread; the loop polls its future each frame
+ai_worker = ThreadPoolExecutor(max_workers=1)
+ai_future = None
+ai_cancel = threading.Event()
 
 while True:
 
+    reset = False
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            ai_cancel.set()
             sys.exit()
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+            reset = True
 
     screen.fill(black)
 
@@ -67,13 +89,13 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_size = min(80, (height - 140) // ROWS, (width - 40) // COLS)
+        tile_origin = (width / 2 - (COLS / 2 * tile_size),
+                       height / 2 - (ROWS / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(ROWS):
             row = []
-            for j in range(3):
+            for j in range(COLS):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -89,12 +111,12 @@ while True:
                 row.append(rect)
             tiles.append(row)
 
-        game_over = ttt.terminal(board)
+        game_over = ttt.terminal(board, K)
         player = ttt.player(board)
 
         # Show title
         if game_over:
-            winner = ttt.winner(board)
+            winner = ttt.winner(board, K)
             if winner is None:
                 title = f"Game Over: Tie."
             else:
@@ -110,20 +132,22 @@ while True:
 
         # Check for AI move
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
+            if ai_future is None:
+                ai_cancel = threading.Event()
+                ai_future = ai_worker.submit(ttt.analyze, board, K, time_budget=TIME_BUDGET,
+                                             cancel=ai_cancel)
+            elif ai_future.done():
+                move, stats = ai_future.result()
+                ai_future = None
+                print(f"Computer plays {move}\n{stats}")
                 board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(ROWS):
+                for j in range(COLS):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
@@ -139,8 +163,14 @@ while True:
                 mouse = pygame.mouse.get_pos()
                 if againButton.collidepoint(mouse):
                     time.sleep(0.2)
-                    user = None
-                    board = ttt.initial_state()
-                    ai_turn = False
+                    reset = True
+
+        # Start over, abandoning any search still running (Escape or Play Again)
+        if reset:
+            ai_cancel.set()
+            ai_future = None
+            user = None
+            board = ttt.initial_state(ROWS, COLS)
 
     pygame.display.flip()
+    clock.tick(FPS)
@@ -0,0 +1,238 @@
+"""
+Headless self-play and tournament harness for tictactoe engines.
+
+Usage: python selfplay.py ENGINE ENGINE [--games N] [--rows R] [--cols C] [-k K]
+                          [--opening PLIES] [--seed SEED]
+
+ENGINE is one of:
+    random          uniformly random legal moves
+    minimax         full minimax
+    minimax:DEPTH   depth-limited minimax
+    id:SECONDS      iterative deepening with a per-move time budget
+    parallel[:DEPTH]  parallel root-splitting minimax
+    mcts:SECONDS    Monte Carlo tree search with random playouts
+    mcts-greedy:SECONDS  Monte Carlo tree search with greedy playouts
+
+The two engines alternate playing X. Each game starts with --opening
+random plies so that deterministic engines do not replay one game.
+"""
+
+import argparse
+import math
+import random
+import time
+from typing import Dict, List, Optional
+
+import mcts
+import tictactoe as ttt
+
+
+class Engine:
+    """
+    A named move chooser with running totals for the benchmark report.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []  # seconds per move
+        self.cpu_time = 0.0
+        self.nodes = 0
+        self.wins = 0
+        self.losses = 0
+        self.draws = 0
+
+    def search(self, board: ttt.Board, k: int, stats: ttt.SearchStats) -> Optional[ttt.Action]:
+        raise NotImplementedError
+
+    def choose(self, board: ttt.Board, k: int) -> Optional[ttt.Action]:
+        stats = ttt.SearchStats()
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        action = self.search(board, k, stats)
+        self.cpu_time += time.process_time() - cpu_start
+        self.latencies.append(time.perf_counter() - start)
+        self.nodes += stats.nodes
+        return action
+
+
+class RandomEngine(Engine):
+    def __init__(self, name: str, rng: random.Random):
+        super().__init__(name)
+        self.rng = rng
+
+    def search(self, board, k, stats):
+        return self.rng.choice(sorted(ttt.actions(board)))
+
+
+class MinimaxEngine(Engine):
+    def __init__(self, name: str, depth_limit: Optional[int] = None):
+        super().__init__(name)
+        self.depth_limit = depth_limit
+        self.table: ttt.TranspositionTable = {}  # kept across moves and games
+
+    def search(self, board, k, stats):
+        return ttt.minimax(board, k, self.depth_limit, self.table, stats)
+
+
+class IterativeDeepeningEngine(Engine):
+    def __init__(self, name: str, time_budget: float):
+        super().__init__(name)
+        self.time_budget = time_budget
+        self.table: ttt.TranspositionTable = {}
+
+    def search(self, board, k, stats):
+        return ttt.iterative_deepening(board, k, self.time_budget, table=self.table, stats=stats)
+
+
+class ParallelEngine(Engine):
+    def __init__(self, name: str, depth_limit: Optional[int] = None):
+        super().__init__(name)
+        self.depth_limit = depth_limit
+        self.table: ttt.TranspositionTable = {}
+
+    def search(self, board, k, stats):
+        return ttt.parallel_minimax(board, k, self.depth_limit, table=self.table, stats=stats)
+
+
+class MCTSEngine(Engine):
+    def __init__(self, name: str, time_budget: float, playout: mcts.Playout,
+                 rng: random.Random):
+        super().__init__(name)
+        self.time_budget = time_budget
+        self.playout = playout
+        self.rng = rng
+        self.player: Optional[mcts.MCTS] = None
+
+    def search(self, board, k, stats):
+        if self.player is None or self.player.k != k:
+            self.player = mcts.MCTS(k, playout=self.playout, rng=self.rng)
+        return self.player.search(board, time_budget=self.time_budget, stats=stats)
+
+
+def make_engine(spec: str, rng: random.Random) -> Engine:
+    """
+    Builds an engine from a spec such as "random", "minimax:4" or "id:0.5".
+    """
+    kind, _, arg = spec.partition(":")
+    try:
+        if kind == "random" and not arg:
+            return RandomEngine(spec, rng)
+        if kind == "minimax":
+            return MinimaxEngine(spec, int(arg) if arg else None)
+        if kind == "id":
+            return IterativeDeepeningEngine(spec, float(arg) if arg else 1.0)
+        if kind == "parallel":
+            return ParallelEngine(spec, int(arg) if arg else None)
+        if kind == "mcts":
+            return MCTSEngine(spec, float(arg) if arg else 1.0, mcts.random_playout, rng)
+        if kind == "mcts-greedy":
+            return MCTSEngine(spec, float(arg) if arg else 1.0, mcts.greedy_playout, rng)
+    except ValueError:
+        pass
+    raise ValueError(f"unknown engine {spec!r}")
+
+
+def play_game(engine_x: Engine, engine_o: Engine, rows: int = ttt.ROWS, cols: int = ttt.COLS,
+              k: int = ttt.K, opening: int = 0,
+              rng: Optional[random.Random] = None) -> Optional[str]:
+    """
+    Plays one game and returns the winner, or None for a draw.
+
+    The first `opening` plies are random moves, not charged to either engine.
+    """
+    rng = rng or random.Random()
+    engines = {ttt.X: engine_x, ttt.O: engine_o}
+    board = ttt.initial_state(rows, cols)
+    while not ttt.terminal(board, k):
+        if opening > 0:
+            action = rng.choice(sorted(ttt.actions(board)))
+            opening -= 1
+        else:
+            action = engines[ttt.player(board)].choose(board, k)
+        board = ttt.result(board, action)
+    champ = ttt.winner(board, k)
+    for mark, engine in engines.items():
+        if champ is None:
+            engine.draws += 1
+        elif champ == mark:
+            engine.wins += 1
+        else:
+            engine.losses += 1
+    return champ
+
+
+def tournament(first: Engine, second: Engine, games: int, rows: int = ttt.ROWS,
+               cols: int = ttt.COLS, k: int = ttt.K, opening: int = 0,
+               rng: Optional[random.Random] = None) -> Dict[Optional[str], int]:
+    """
+    Plays `games` games, alternating which engine plays X.
+
+    Returns how many games each engine won, keyed by engine name, with
+    draws counted under None.
+    """
+    rng = rng or random.Random()
+    outcomes = {first.name: 0, second.name: 0, None: 0}
+    for game in range(games):
+        engine_x, engine_o = (first, second) if game % 2 == 0 else (second, first)
+        champ = play_game(engine_x, engine_o, rows, cols, k, opening, rng)
+        outcomes[None if champ is None else engine_x.name if champ == ttt.X else engine_o.name] += 1
+    return outcomes
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """
+    Returns the nearest-rank `pct` percentile of `samples`.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def report(engines: List[Engine]) -> str:
+    """
+    Returns a table of outcomes, search volume and move latency per engine.
+    """
+    lines = [f"{'engine':>14} {'W':>6} {'D':>6} {'L':>6} {'moves':>7} {'nodes':>10} "
+             f"{'nodes/s':>10} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}"]
+    for engine in engines:
+        elapsed = sum(engine.latencies)
+        rate = engine.nodes / elapsed if elapsed else 0.0
+        ms = [1000 * percentile(engine.latencies, pct) for pct in (50, 90, 99, 100)]
+        lines.append(f"{engine.name:>14} {engine.wins:>6} {engine.draws:>6} {engine.losses:>6} "
+                     f"{len(engine.latencies):>7} {engine.nodes:>10} {rate:>10.0f} "
+                     + " ".join(f"{value:>8.2f}" for value in ms))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("engines", nargs=2, metavar="ENGINE")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=ttt.ROWS)
+    parser.add_argument("--cols", type=int, default=ttt.COLS)
+    parser.add_argument("-k", type=int, default=ttt.K)
+    parser.add_argument("--opening", type=int, default=2,
+                        help="random plies at the start of each game")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    try:
+        first, second = [make_engine(spec, rng) for spec in args.engines]
+    except ValueError as e:
+        parser.error(str(e))
+    if first.name == second.name:
+        second.name += "'"
+
+    start = time.perf_counter()
+    tournament(first, second, args.games, args.rows, args.cols, args.k, args.opening, rng)
+    elapsed = time.perf_counter() - start
+    print(f"{args.games} games on {args.rows}x{args.cols}, {args.k} in a row, "
+          f"in {elapsed:.1f}s")
+    print(report([first, second]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+import mcts
+import tictactoe as ttt
+
+X = ttt.X
+O = ttt.O
+N = ttt.EMPTY
+
+
+@pytest.mark.parametrize("board, expected_actions, name", [
+    ([[X, X, N],
+      [O, O, N],
+      [N, N, N]], {(0, 2)}, "X can win top row - should take it"),
+    ([[X, X, N],
+      [O, N, N],
+      [N, N, N]], {(0, 2)}, "X about to win top row - O must block"),
+    ([[O, X, X],
+      [N, O, N],
+      [N, N, N]], {(2, 2)}, "O can win diagonal - should take it"),
+])
+@pytest.mark.parametrize("playout", [mcts.random_playout, mcts.greedy_playout])
+def test_search(board, expected_actions, name, playout):
+    player = mcts.MCTS(playout=playout, rng=random.Random(0))
+    assert player.search(board, iterations=2000) in expected_actions, name
+
+
+def test_search_terminal():
+    board = [[X, O, X],
+             [X, O, O],
+             [O, X, X]]
+    assert mcts.MCTS().search(board) is None
+
+
+def test_iteration_budget():
+    player = mcts.MCTS(4, rng=random.Random(1))
+    stats = ttt.SearchStats()
+    action = player.search(ttt.initial_state(5, 5), iterations=50, stats=stats)
+    assert action in ttt.actions(ttt.initial_state(5, 5))
+    assert player.iterations == 50
+    assert player.root.visits == 50
+    assert stats.nodes >= 50
+
+
+def test_time_budget_runs_at_least_once():
+    player = mcts.MCTS(rng=random.Random(2))
+    assert player.search(ttt.initial_state(), time_budget=0) is not None
+    assert player.iterations == 1
+
+
+def test_tree_reused_after_reply():
+    player = mcts.MCTS(rng=random.Random(3))
+    board = ttt.initial_state()
+    action = player.search(board, iterations=500)
+    board = ttt.result(board, action)
+    reply = next(iter(player.root.children[action].children))
+    board = ttt.result(board, reply)
+    reused = player.root.children[action].children[reply]
+    visits = reused.visits
+
+    player.search(board, iterations=100)
+    assert player.root is reused
+    assert player.root.parent is None
+    assert player.root.visits == visits + 100
+
+
+def test_tree_not_reused_for_unrelated_board():
+    player = mcts.MCTS(rng=random.Random(4))
+    player.search(ttt.initial_state(), iterations=100)
+    board = [[X, O, N],
+             [N, X, N],
+             [O, N, N]]
+    player.search(board, iterations=10)
+    assert player.root.visits == 10
+
+
+def test_greedy_playout_completes_line():
+    board = ttt.initial_state(5, 5)
+    for j in range(3):
+        board[0][j] = X
+        board[4][j] = O
+    stats = ttt.SearchStats()
+    assert mcts.greedy_playout(board, 4, random.Random(5), stats) == X
+    assert stats.nodes == 1
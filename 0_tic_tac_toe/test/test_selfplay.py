@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+import selfplay
+import tictactoe as ttt
+
+
+def test_make_engine():
+    rng = random.Random(0)
+    assert isinstance(selfplay.make_engine("random", rng), selfplay.RandomEngine)
+    assert selfplay.make_engine("minimax:3", rng).depth_limit == 3
+    assert selfplay.make_engine("minimax", rng).depth_limit is None
+    assert selfplay.make_engine("id:0.25", rng).time_budget == 0.25
+    for spec in ["alphabeta", "minimax:x", "random:2"]:
+        with pytest.raises(ValueError):
+            selfplay.make_engine(spec, rng)
+
+
+def test_minimax_never_loses_to_random():
+    rng = random.Random(1)
+    engine = selfplay.make_engine("minimax", rng)
+    rival = selfplay.make_engine("random", rng)
+    outcomes = selfplay.tournament(engine, rival, 50, rng=rng)
+    assert outcomes["random"] == 0
+    assert sum(outcomes.values()) == 50
+    assert engine.wins + engine.draws == 50
+    assert rival.losses == engine.wins
+
+
+def test_stats_recorded():
+    rng = random.Random(2)
+    first = selfplay.make_engine("minimax:2", rng)
+    second = selfplay.make_engine("random", rng)
+    champ = selfplay.play_game(first, second, 4, 4, 3, rng=rng)
+    assert champ in {ttt.X, ttt.O, None}
+    assert first.nodes > 0
+    assert second.nodes == 0
+    assert len(first.latencies) >= len(second.latencies) >= 1
+    assert "minimax:2" in selfplay.report([first, second])
+
+
+def test_opening_moves_not_charged():
+    rng = random.Random(3)
+    first = selfplay.make_engine("random", rng)
+    second = selfplay.make_engine("random", rng)
+    selfplay.play_game(first, second, opening=4, rng=rng)
+    assert len(first.latencies) + len(second.latencies) <= 5
+
+
+@pytest.mark.parametrize("pct, expected", [
+    (0, 1.0),
+    (50, 3.0),
+    (90, 5.0),
+    (100, 5.0),
+])
+def test_percentile(pct, expected):
+    assert selfplay.percentile([5.0, 1.0, 4.0, 2.0, 3.0], pct) == expected
@@ -1,3 +1,6 @@
+import threading
+import time
+
 import pytest
 
 import tictactoe as ttt
@@ -227,3 +230,397 @@ def test_minimax_terminal(board):
 def test_minimax(board, expected_actions, name):
     action = ttt.minimax(board)
     assert action in expected_actions, f"{name}: got {action}, expected one of {expected_actions}"
+
+
+# --- Generalized m,n,k boards ---
+
+def test_initial_state_shape():
+    board = ttt.initial_state(4, 6)
+    assert len(board) == 4
+    assert all(len(row) == 6 for row in board)
+    assert len(ttt.actions(board)) == 24
+
+    board[0][0] = X
+    assert all(row[0] == EMPTY for row in board[1:])
+
+
+@pytest.mark.parametrize("i, j", [
+    (4, 0),
+    (0, 5),
+    (-1, 2),
+])
+def test_result_index_errors_rectangular(i, j):
+    board = ttt.initial_state(4, 5)
+    ttt.result(board, (3, 4))
+    with pytest.raises(IndexError):
+        ttt.result(board, (i, j))
+
+
+@pytest.mark.parametrize("cells, k, expected, name", [
+    ([(0, 0), (0, 1), (0, 2)], 4, N, "Three in a row is not enough for k=4"),
+    ([(1, 1), (1, 2), (1, 3), (1, 4)], 4, X, "Row of four"),
+    ([(0, 4), (1, 4), (2, 4), (3, 4)], 4, X, "Column of four on the edge"),
+    ([(1, 0), (2, 1), (3, 2), (4, 3)], 4, X, "Diagonal of four"),
+    ([(0, 4), (1, 3), (2, 2), (3, 1)], 4, X, "Anti-diagonal of four"),
+    ([(2, 0), (2, 1), (2, 3), (2, 4)], 4, N, "Gap breaks the row"),
+])
+def test_winner_k_in_a_row(cells, k, expected, name):
+    board = ttt.initial_state(5, 5)
+    for i, j in cells:
+        board[i][j] = X
+    assert expected == ttt.winner(board, k), name
+
+
+def test_evaluate_sign():
+    board = ttt.initial_state(4, 4)
+    assert 0 == ttt.evaluate(board, 3)
+
+    board[1][1] = X
+    assert 0 < ttt.evaluate(board, 3) < 1
+
+    board[1][1] = O
+    assert -1 < ttt.evaluate(board, 3) < 0
+
+
+def test_minimax_depth_limited_takes_win():
+    board = ttt.initial_state(6, 6)
+    for j in range(3):
+        board[2][j] = X
+        board[4][j] = O
+    assert ttt.minimax(board, 4, depth_limit=2) == (2, 3)
+
+
+def test_minimax_depth_limited_blocks():
+    board = ttt.initial_state(6, 6)
+    for j in range(1, 4):
+        board[3][j] = X
+    board[0][0] = O
+    board[5][5] = O
+    board[1][1] = X
+    assert ttt.minimax(board, 5, depth_limit=2) in {(3, 0), (3, 4)}
+
+
+def test_minimax_depth_limit_validation():
+    with pytest.raises(ValueError):
+        ttt.minimax(ttt.initial_state(), depth_limit=0)
+
+
+# --- Iterative deepening ---
+
+@pytest.mark.parametrize("board, expected_actions", [
+    ([[X, X, N],
+      [O, N, N],
+      [N, N, N]], {(0, 2)}),
+    ([[O, N, X],
+      [N, X, N],
+      [N, N, N]], {(2, 0)}),
+    ([[X, O, X],
+      [N, N, N],
+      [O, N, N]], {(1, 1), (1, 2), (2, 1), (2, 2)}),
+])
+def test_iterative_deepening_matches_minimax(board, expected_actions):
+    assert ttt.iterative_deepening(board, time_budget=5.0) in expected_actions
+
+
+def test_iterative_deepening_terminal():
+    board = [[X, X, X],
+             [O, O, N],
+             [N, N, N]]
+    assert ttt.iterative_deepening(board) is None
+
+
+def test_iterative_deepening_respects_budget():
+    board = ttt.initial_state(7, 7)
+    board[3][3] = X
+    start = time.monotonic()
+    action = ttt.iterative_deepening(board, 4, time_budget=0.2)
+    assert time.monotonic() - start < 1.0
+    assert action in ttt.actions(board)
+
+
+def test_iterative_deepening_finds_win_on_large_board():
+    board = ttt.initial_state(7, 7)
+    for j in range(3):
+        board[1][j] = X
+        board[5][j] = O
+    assert ttt.iterative_deepening(board, 4, time_budget=0.5) == (1, 3)
+
+
+def test_ordered_actions_tries_pv_first():
+    board = ttt.initial_state()
+    acts = ttt.actions(board)
+    assert ttt.ordered_actions(acts, (2, 1), (0, 0))[0] == (2, 1)
+    assert ttt.ordered_actions(acts, None, (1, 2))[0] == (1, 2)
+    assert set(ttt.ordered_actions(acts, None)) == acts
+
+
+# --- Transposition table and parallel search ---
+
+def test_minimax_fills_table():
+    board = [[X, O, X],
+             [N, N, N],
+             [O, N, N]]
+    table = {}
+    action = ttt.minimax(board, table=table)
+    entry = table[ttt.board_key(board)]
+    assert entry.flag == ttt.EXACT
+    assert entry.action == action
+    assert entry.value == 3  # X forks and wins with the seventh mark
+    # A second search answers straight from the table
+    assert ttt.minimax(board, table=table) == action
+
+
+@pytest.mark.parametrize("board, expected_actions", [
+    ([[X, X, N],
+      [O, N, N],
+      [N, N, N]], {(0, 2)}),
+    ([[O, N, X],
+      [N, X, N],
+      [N, N, N]], {(2, 0)}),
+    ([[X, N, N],
+      [N, N, N],
+      [N, N, N]], {(1, 1)}),
+])
+def test_parallel_minimax(board, expected_actions):
+    table = {}
+    assert ttt.parallel_minimax(board, workers=2, table=table) in expected_actions
+    assert table
+
+
+def test_max_value_line_follows_table():
+    board = [[X, O, EMPTY],
+             [EMPTY, X, EMPTY],
+             [O, EMPTY, EMPTY]]
+    ctx = ttt.SearchContext(board, table={})
+    pos = ttt.Position(board, ttt.K)
+    best = ttt.max_value(pos, 0, ctx)
+    assert best.value > 0
+    assert best.line[0] == best.action == ctx.best_action
+    assert pos.board == board
+    for action in best.line:
+        board = ttt.result(board, action)
+    assert ttt.winner(board) == X
+
+
+def test_search_without_table_matches_minimax():
+    board = [[X, EMPTY, EMPTY],
+             [EMPTY, O, EMPTY],
+             [EMPTY, EMPTY, EMPTY]]
+    ctx = ttt.SearchContext(board)
+    value = ttt.search_max(ttt.Position(board, ttt.K), 0, ctx, ttt.INT_MIN, ttt.INT_MAX, None)
+    assert value == 0
+    assert ctx.best_action in ttt.actions(board)
+    assert not hasattr(ttt.ValuedAction(0), "__dict__")
+
+
+def test_parallel_minimax_terminal():
+    board = [[X, O, X],
+             [X, O, O],
+             [O, X, X]]
+    assert ttt.parallel_minimax(board, workers=2) is None
+
+
+# --- Position make/unmake ---
+
+def test_position_tracks_board():
+    board = [[X, N, N],
+             [N, O, N],
+             [N, N, N]]
+    pos = ttt.Position(board)
+    assert pos.board == board
+    assert pos.board is not board
+    assert pos.turn == X
+    assert pos.moves == 2
+    assert pos.actions() == ttt.actions(board)
+    assert pos.key == ttt.board_key(board)
+
+    pos.make((0, 1))
+    board = ttt.result(board, (0, 1))
+    assert pos.board == board
+    assert pos.turn == O
+    assert pos.moves == 3
+    assert pos.key == ttt.board_key(board)
+    assert pos.evaluate() == ttt.evaluate(board)
+
+
+def test_position_unmake_restores():
+    board = ttt.initial_state(4, 5)
+    pos = ttt.Position(board, 3)
+    key, score = pos.key, pos.score
+    moves = [(0, 0), (1, 1), (0, 1), (2, 2), (0, 2)]
+    for action in moves:
+        pos.make(action)
+    assert pos.winner() == X
+    for action in reversed(moves):
+        pos.unmake(action)
+    assert pos.board == board
+    assert pos.winner() is None
+    assert (pos.key, pos.score, pos.moves, pos.turn) == (key, score, 0, X)
+
+
+@pytest.mark.parametrize("moves, k", [
+    ([(0, 0), (4, 4), (1, 1), (4, 3), (2, 2), (3, 4), (3, 3)], 4),
+    ([(0, 4), (0, 0), (1, 4), (1, 0), (2, 4), (2, 0), (3, 4)], 4),
+    ([(2, 0), (0, 0), (2, 1), (0, 1), (2, 2)], 3),
+    ([(0, 0), (1, 1), (0, 4), (2, 2)], 3),
+])
+def test_position_agrees_with_board_functions(moves, k):
+    board = ttt.initial_state(5, 5)
+    pos = ttt.Position(board, k)
+    for action in moves:
+        board = ttt.result(board, action)
+        pos.make(action)
+        assert pos.winner() == ttt.winner(board, k)
+        assert pos.evaluate() == pytest.approx(ttt.evaluate(board, k))
+        assert pos.turn == ttt.player(board)
+
+
+def test_iterative_deepening_cancelled_before_start():
+    cancel = threading.Event()
+    cancel.set()
+    assert ttt.iterative_deepening(ttt.initial_state(), cancel=cancel) is None
+
+
+def test_iterative_deepening_cancelled_from_other_thread():
+    board = ttt.initial_state(7, 7)
+    cancel = threading.Event()
+    timer = threading.Timer(0.1, cancel.set)
+    timer.start()
+    start = time.monotonic()
+    assert ttt.iterative_deepening(board, 5, time_budget=30.0, cancel=cancel) is None
+    assert time.monotonic() - start < 5.0
+    timer.join()
+
+
+# --- Batch evaluation ---
+
+def test_evaluate_many_matches_minimax():
+    boards = [
+        [[X, X, N],
+         [O, N, N],
+         [N, N, N]],
+        [[O, N, X],
+         [N, X, N],
+         [N, N, N]],
+        [[N, X, O],
+         [N, O, X],
+         [O, N, X]],
+        [[X, N, N],
+         [X, O, N],
+         [N, N, N]],
+    ]
+    evaluations = ttt.evaluate_many(boards)
+    assert [e.action for e in evaluations] == [(0, 2), (2, 0), None, (2, 0)]
+    assert evaluations[0].value > 0
+    assert evaluations[2].value < 0
+    assert evaluations[1].value == 0
+
+
+def test_evaluate_many_symmetric_boards_share_cache():
+    corner = [[X, X, N],
+              [O, N, N],
+              [N, N, N]]
+    mirrored = [[N, N, N],
+                [N, N, X],
+                [N, O, X]]  # corner board reflected in the anti-diagonal
+    cache = {}
+    evaluations = ttt.evaluate_many([corner, mirrored, corner], cache=cache)
+    assert len(cache) == 1
+    assert evaluations[0] == evaluations[2]
+    assert evaluations[1].value == evaluations[0].value
+    # O blocks in both, at the reflection of (0, 2)
+    assert evaluations[0].action == (0, 2)
+    assert evaluations[1].action == (0, 2)
+
+
+def test_evaluate_many_rectangular_and_terminal():
+    full = [[X, O, X],
+            [X, O, O],
+            [O, X, X]]
+    wide = ttt.initial_state(2, 4)
+    wide[0][0] = wide[0][1] = X
+    wide[1][0] = O
+    wide[1][3] = O
+    evaluations = ttt.evaluate_many([full, wide], 3)
+    assert evaluations[0] == ttt.Evaluation(0, None)
+    assert evaluations[1].action == (0, 2)
+
+
+def test_winners_many():
+    boards = [
+        [[X, X, X], [O, O, N], [N, N, N]],
+        [[O, X, X], [X, O, N], [N, N, O]],
+        [[X, O, X], [X, O, O], [O, X, X]],
+    ]
+    bits = [ttt.bitboards(board) for board in boards]
+    assert ttt.winners_many(bits, 3, 3) == [X, O, None]
+
+
+def test_winners_many_without_numpy(monkeypatch):
+    boards = [
+        [[X, X, X], [O, O, N], [N, N, N]],
+        [[O, X, X], [X, O, N], [N, N, O]],
+        [[X, O, X], [X, O, O], [O, X, X]],
+        [[X, X, X], [O, O, O], [N, N, N]],  # both have a line
+        [[O, O, O], [X, X, X], [N, N, N]],
+    ]
+    bits = [ttt.bitboards(board) for board in boards]
+    vectorized = ttt.winners_many(bits, 3, 3)
+    monkeypatch.setattr(ttt, "np", None)
+    champs = ttt.winners_many(bits, 3, 3)
+    assert champs[:4] == [ttt.winner(board) for board in boards[:4]]
+    # winner() reports whichever line it finds first; both paths prefer X
+    assert champs == vectorized == [X, O, None, X, X]
+
+
+# --- Search statistics ---
+
+def test_analyze_stats():
+    board = [[X, O, X],
+             [N, N, N],
+             [O, N, N]]
+    action, stats = ttt.analyze(board)
+    assert action in {(1, 1), (1, 2), (2, 1), (2, 2)}
+    assert stats.nodes > stats.terminals > 0
+    assert stats.evaluations == 0
+    assert stats.table_hits + stats.table_misses > 0
+    assert stats.cutoffs > 0
+    assert stats.max_depth <= 5
+    assert set(stats.root_times) <= ttt.actions(board)
+    assert stats.elapsed > 0
+    assert "nodes" in str(stats)
+
+
+def test_analyze_depth_limited_stats():
+    action, stats = ttt.analyze(ttt.initial_state(5, 5), 4, depth_limit=2)
+    assert action is not None
+    assert stats.max_depth == 2
+    assert stats.evaluations > 0
+    assert set(stats.root_times) == ttt.actions(ttt.initial_state(5, 5))
+
+
+def test_analyze_time_budget_stats():
+    action, stats = ttt.analyze(ttt.initial_state(6, 6), 4, time_budget=0.1)
+    assert action is not None
+    assert stats.max_depth >= 1
+    assert stats.elapsed < 1.0
+
+
+def test_stats_merge():
+    first, second = ttt.SearchStats(), ttt.SearchStats()
+    first.nodes, first.max_depth, first.root_times = 10, 3, {(0, 0): 1.0}
+    second.nodes, second.max_depth, second.root_times = 5, 4, {(0, 0): 0.5, (1, 1): 2.0}
+    first.merge(second)
+    assert first.nodes == 15
+    assert first.max_depth == 4
+    assert first.root_times == {(0, 0): 1.5, (1, 1): 2.0}
+
+
+def test_parallel_minimax_stats():
+    board = [[X, N, N],
+             [N, N, N],
+             [N, N, N]]
+    stats = ttt.SearchStats()
+    ttt.parallel_minimax(board, workers=2, stats=stats)
+    assert set(stats.root_times) == ttt.actions(board)
+    assert stats.nodes > len(stats.root_times)
@@ -3,8 +3,19 @@ Tic Tac Toe Player
 """
 
 import copy
+import functools
+import os
+import random
 import sys
-from typing import List, Optional, Set, Tuple
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy only speeds up evaluate_many
+    np = None
 
 X = "X"
 O = "O"
@@ -13,17 +24,41 @@ EMPTY = None
 INT_MIN = -sys.maxsize - 1
 INT_MAX = sys.maxsize
 
+# Weight per extra mark in an open window for the heuristic evaluation
+HEURISTIC_BASE = 10
+
+# Default m,n,k game: a 3x3 board with 3 in a row to win
+ROWS = 3
+COLS = 3
+K = 3
+
+# Line directions checked for k-in-a-row: horizontal, vertical and both diagonals
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+# Transposition table entry flags: how an entry's value relates to the true value
+EXACT = 0
+LOWER = 1  # value is a lower bound (search failed high)
+UPPER = 2  # value is an upper bound (search failed low)
+
+# Plies below a worker's root whose table entries are sent back to be shared
+SHARED_PLIES = 4
+
+# Fixed so that every process hashes positions the same way
+ZOBRIST_SEED = 50
+
+# Boards with at most this many cells fit a numpy uint64 bitboard
+NUMPY_MAX_CELLS = 64
+
 Action = Tuple[int, int]
 Board = List[List[Optional[str]]]
+BoardKey = int
 
 
-def initial_state() -> Board:
+def initial_state(rows: int = ROWS, cols: int = COLS) -> Board:
     """
-    Returns starting state of the board.
+    Returns starting state of a rows x cols board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * cols for _ in range(rows)]
 
 
 def player(board: Board) -> str:
@@ -54,7 +89,7 @@ def result(board: Board, action: Action) -> Board:
     board = copy.deepcopy(board)
     i = action[0]
     j = action[1]
-    if (i < 0) or (i > 2) or (j < 0) or (j > 2):
+    if (i < 0) or (i >= len(board)) or (j < 0) or (j >= len(board[i])):
         raise IndexError("Action out of bounds")
     if board[i][j] != EMPTY:
         raise RuntimeError(f"Invalid board change requested: {i}, {j}")
@@ -62,78 +97,886 @@ def result(board: Board, action: Action) -> Board:
     return board
 
 
-def winner(board: Board) -> Optional[str]:
+def winner(board: Board, k: int = K) -> Optional[str]:
     """
     Returns the winner of the game, if there is one.
     """
-    for i in range(len(board)):
-        if board[i][0] and all([board[i][j] == board[i][0] for j in range(1, 3)]):
-            return board[i][0]
-        if board[0][i] and all([board[j][i] == board[0][i] for j in range(1, 3)]):
-            return board[0][i]
-    if board[1][1] and (all([board[i][i] == board[1][1] for i in range(3)]) or
-                        all([board[i][2 - i] == board[1][1] for i in range(3)])):
-        return board[1][1]
+    rows, cols = len(board), len(board[0])
+    for i in range(rows):
+        for j in range(cols):
+            mark = board[i][j]
+            if mark is EMPTY:
+                continue
+            for di, dj in DIRECTIONS:
+                # Only look forward from the first cell of each candidate line
+                end_i, end_j = i + (k - 1) * di, j + (k - 1) * dj
+                if not (0 <= end_i < rows and 0 <= end_j < cols):
+                    continue
+                if all(board[i + n * di][j + n * dj] == mark for n in range(1, k)):
+                    return mark
+    return None
 
 
-def terminal(board: Board) -> bool:
+def is_full(board: Board) -> bool:
+    """
+    Returns True if no empty cells remain on the board.
+    """
+    return all(cell != EMPTY for row in board for cell in row)
+
+
+def terminal(board: Board, k: int = K) -> bool:
     """
     Returns True if game is over, False otherwise.
     """
-    is_full = all([board[i][j] != EMPTY for i in range(3) for j in range(3)])
-    return (winner(board) is not None) or is_full
+    return (winner(board, k) is not None) or is_full(board)
 
 
-def utility(board: Board) -> int:
+def utility(board: Board, k: int = K) -> int:
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    champ = winner(board)
+    champ = winner(board, k)
     return 1 if champ == X else -1 if champ == O else 0
 
 
+def windows(rows: int, cols: int, k: int) -> List[List[Action]]:
+    """
+    Returns every line segment of k cells on a rows x cols board,
+    i.e., every place a player could still make k in a row.
+    """
+    lines = []
+    for i in range(rows):
+        for j in range(cols):
+            for di, dj in DIRECTIONS:
+                end_i, end_j = i + (k - 1) * di, j + (k - 1) * dj
+                if 0 <= end_i < rows and 0 <= end_j < cols:
+                    lines.append([(i + n * di, j + n * dj) for n in range(k)])
+    return lines
+
+
+def evaluate(board: Board, k: int = K) -> float:
+    """
+    Returns a heuristic value in (-1, 1) for a non-terminal board,
+    positive when X is better placed and negative when O is.
+
+    Each k-cell window still open to only one player scores for that
+    player, weighted heavily by how many of its cells are already taken.
+    """
+    score = 0
+    for line in windows(len(board), len(board[0]), k):
+        marks = [board[i][j] for i, j in line]
+        num_x = marks.count(X)
+        num_o = marks.count(O)
+        if num_x and not num_o:
+            score += HEURISTIC_BASE ** num_x
+        elif num_o and not num_x:
+            score -= HEURISTIC_BASE ** num_o
+    return score / (abs(score) + 1)
+
+
+@functools.lru_cache(maxsize=None)
+def line_geometry(rows: int, cols: int, k: int) -> Tuple[List[List[Action]], Dict[Action, List[int]]]:
+    """
+    Returns the board's k-cell windows and, for each cell, the indexes
+    of the windows passing through it.
+    """
+    lines = windows(rows, cols, k)
+    cell_lines = {(i, j): [] for i in range(rows) for j in range(cols)}
+    for index, line in enumerate(lines):
+        for cell in line:
+            cell_lines[cell].append(index)
+    return lines, cell_lines
+
+
+@functools.lru_cache(maxsize=None)
+def zobrist_keys(rows: int, cols: int) -> Dict[str, List[List[int]]]:
+    """
+    Returns a random 64-bit key per mark per cell; a position's hash is
+    the XOR of the keys of its marks.
+    """
+    rng = random.Random(ZOBRIST_SEED)
+    return {mark: [[rng.getrandbits(64) for _ in range(cols)] for _ in range(rows)]
+            for mark in (X, O)}
+
+
+def line_value(own: int, other: int) -> int:
+    """
+    Returns a window's contribution to the heuristic for the player with
+    `own` marks in it (see evaluate).
+    """
+    return HEURISTIC_BASE ** own if own and not other else 0
+
+
+class Position:
+    """
+    Mutable game state for search, changed in place by make and unmake.
+
+    Alongside the board it keeps the move count, the side to move, a
+    Zobrist hash and per-window mark counts, so the winner and heuristic
+    value are available in O(1) after each move instead of by rescanning.
+    """
+
+    def __init__(self, board: Board, k: int = K):
+        self.rows = len(board)
+        self.cols = len(board[0])
+        self.k = k
+        self.board = initial_state(self.rows, self.cols)
+        lines, self.cell_lines = line_geometry(self.rows, self.cols, k)
+        self.zobrist = zobrist_keys(self.rows, self.cols)
+        self.counts = {X: [0] * len(lines), O: [0] * len(lines)}
+        self.complete = {X: 0, O: 0}  # windows filled by each player
+        self.empties = set(self.cell_lines)
+        self.moves = 0
+        self.score = 0
+        self.key = 0
+        for i in range(self.rows):
+            for j in range(self.cols):
+                if board[i][j] != EMPTY:
+                    self.place((i, j), board[i][j])
+        self.turn = player(board)
+
+    def place(self, action: Action, mark: str):
+        i, j = action
+        self.board[i][j] = mark
+        self.empties.remove(action)
+        self.moves += 1
+        self.key ^= self.zobrist[mark][i][j]
+        own = self.counts[mark]
+        other = self.counts[O if mark == X else X]
+        sign = 1 if mark == X else -1
+        for line in self.cell_lines[action]:
+            before = line_value(own[line], other[line]) - line_value(other[line], own[line])
+            own[line] += 1
+            if own[line] == self.k:
+                self.complete[mark] += 1
+            after = line_value(own[line], other[line]) - line_value(other[line], own[line])
+            self.score += sign * (after - before)
+
+    def remove(self, action: Action):
+        i, j = action
+        mark = self.board[i][j]
+        self.board[i][j] = EMPTY
+        self.empties.add(action)
+        self.moves -= 1
+        self.key ^= self.zobrist[mark][i][j]
+        own = self.counts[mark]
+        other = self.counts[O if mark == X else X]
+        sign = 1 if mark == X else -1
+        for line in self.cell_lines[action]:
+            before = line_value(own[line], other[line]) - line_value(other[line], own[line])
+            if own[line] == self.k:
+                self.complete[mark] -= 1
+            own[line] -= 1
+            after = line_value(own[line], other[line]) - line_value(other[line], own[line])
+            self.score += sign * (after - before)
+
+    def make(self, action: Action):
+        """
+        Plays `action` for the side to move.
+        """
+        self.place(action, self.turn)
+        self.turn = O if self.turn == X else X
+
+    def unmake(self, action: Action):
+        """
+        Takes back `action`, which must be the last move made.
+        """
+        self.remove(action)
+        self.turn = O if self.turn == X else X
+
+    def actions(self) -> Set[Action]:
+        return self.empties
+
+    def winner(self) -> Optional[str]:
+        return X if self.complete[X] else O if self.complete[O] else None
+
+    def is_full(self) -> bool:
+        return not self.empties
+
+    def evaluate(self) -> float:
+        """
+        Same value as evaluate(self.board, self.k), kept up to date per move.
+        """
+        return self.score / (abs(self.score) + 1)
+
+
 class ValuedAction:
-    def __init__(self, init_value: int, action: Optional[Action] = None):
+    __slots__ = ("value", "action", "line")
+
+    def __init__(self, init_value: float, action: Optional[Action] = None,
+                 line: Optional[List[Action]] = None):
         self.value = init_value
         self.action = action
+        self.line = line or []  # best line of play from here, starting with action
+
+
+class TableEntry(NamedTuple):
+    draft: int  # plies searched below the position
+    flag: int
+    value: float
+    action: Optional[Action]
+
+
+TranspositionTable = Dict[BoardKey, TableEntry]
+
+
+def board_key(board: Board) -> BoardKey:
+    """
+    Returns the board's Zobrist hash, its key in transposition tables.
+    """
+    keys = zobrist_keys(len(board), len(board[0]))
+    key = 0
+    for i, row in enumerate(board):
+        for j, mark in enumerate(row):
+            if mark != EMPTY:
+                key ^= keys[mark][i][j]
+    return key
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when its deadline has passed.
+    """
+
+
+class SearchCancelled(Exception):
+    """
+    Raised inside a search when its cancel event has been set.
+    """
+
+
+class SearchStats:
+    """
+    Counters filled in by a search when one is passed to it.
+    """
+    def __init__(self):
+        self.nodes = 0  # positions visited
+        self.terminals = 0  # finished games reached
+        self.evaluations = 0  # positions scored by the heuristic at the depth limit
+        self.table_hits = 0  # lookups that found a usable entry
+        self.table_misses = 0
+        self.cutoffs = 0  # alpha-beta cutoffs
+        self.max_depth = 0  # deepest ply reached below the root
+        self.root_times: Dict[Action, float] = {}  # seconds searching below each root move
+        self.elapsed = 0.0  # seconds for the whole search, set by analyze
+
+    def merge(self, other: "SearchStats"):
+        """
+        Adds another search's counters (e.g., a parallel worker's) to these.
+        """
+        self.nodes += other.nodes
+        self.terminals += other.terminals
+        self.evaluations += other.evaluations
+        self.table_hits += other.table_hits
+        self.table_misses += other.table_misses
+        self.cutoffs += other.cutoffs
+        self.max_depth = max(self.max_depth, other.max_depth)
+        for action, seconds in other.root_times.items():
+            self.root_times[action] = self.root_times.get(action, 0.0) + seconds
+
+    def __str__(self):
+        lookups = self.table_hits + self.table_misses
+        hit_rate = self.table_hits / lookups if lookups else 0.0
+        rate = self.nodes / self.elapsed if self.elapsed else 0.0
+        lines = [f"{self.nodes} nodes in {self.elapsed:.3f}s ({rate:.0f}/s), "
+                 f"max depth {self.max_depth}",
+                 f"{self.terminals} terminal, {self.evaluations} heuristic evaluations, "
+                 f"{self.cutoffs} cutoffs",
+                 f"table: {self.table_hits} hits, {self.table_misses} misses "
+                 f"({hit_rate:.0%})"]
+        for action, seconds in sorted(self.root_times.items(), key=lambda item: -item[1]):
+            lines.append(f"  {action}: {seconds:.3f}s")
+        return "\n".join(lines)
+
+
+class SearchContext:
+    """
+    Settings shared by every node of a single minimax search.
+    """
+    def __init__(self, board: Board, k: int = K, depth_limit: Optional[int] = None,
+                 deadline: Optional[float] = None,
+                 table: Optional[TranspositionTable] = None,
+                 stats: Optional[SearchStats] = None,
+                 cancel: Optional[threading.Event] = None):
+        self.k = k
+        self.depth_limit = depth_limit
+        self.deadline = deadline
+        self.cancel = cancel
+        self.table = table
+        self.stats = SearchStats() if stats is None else stats
+        self.cells = len(board) * len(board[0])
+        self.root_empties = sum(row.count(EMPTY) for row in board)
+        self.cut_off = False  # set once any position is scored by the heuristic
+        self.best_action: Optional[Action] = None  # of the last node searched to completion
+
+    def draft(self, depth: int) -> int:
+        """
+        Returns how many plies below `depth` this search looks.
+        """
+        remaining = self.root_empties - depth
+        if self.depth_limit is None:
+            return remaining
+        return min(self.depth_limit - depth, remaining)
+
+
+def leaf_score(pos: Position, depth: int, ctx: SearchContext) -> Optional[float]:
+    """
+    Returns the score of the position if the search stops here, else None.
+
+    Wins are scored by how many marks are on the board rather than by
+    depth, so a position scores the same from any root and can be shared
+    through the transposition table.
+    """
+    stats = ctx.stats
+    stats.nodes += 1
+    if depth > stats.max_depth:
+        stats.max_depth = depth
+    if ctx.deadline is not None and time.monotonic() > ctx.deadline:
+        raise SearchTimeout()
+    if ctx.cancel is not None and ctx.cancel.is_set():
+        raise SearchCancelled()
+    champ = pos.winner()
+    if champ is not None:
+        stats.terminals += 1
+        return (1 if champ == X else -1) * (ctx.cells + 1 - pos.moves)
+    if pos.is_full():
+        stats.terminals += 1
+        return 0
+    if ctx.depth_limit is not None and depth >= ctx.depth_limit:
+        ctx.cut_off = True
+        stats.evaluations += 1
+        return pos.evaluate()
+    return None
+
+
+def ordered_actions(acts: Iterable[Action], first: Optional[Action],
+                    hint: Optional[Action] = None) -> List[Action]:
+    """
+    Returns the actions, with `first` (the principal variation's move,
+    i.e., the best move found here by a previous search) tried first, or
+    else the transposition table's `hint`.
+    """
+    acts = list(acts)
+    first = first or hint
+    if first in acts:
+        acts.remove(first)
+        acts.insert(0, first)
+    return acts
 
-    def __lt__(self, other: "ValuedAction"):
-        return self.value < other.value
 
-    def __gt__(self, other: "ValuedAction"):
-        return self.value > other.value
+def probe(entry: Optional[TableEntry], depth: int, ctx: SearchContext) -> bool:
+    """
+    Returns whether a transposition table entry was searched at least as
+    deeply as this search needs.
+    """
+    if entry is None or entry.draft < ctx.draft(depth):
+        ctx.stats.table_misses += 1
+        return False
+    ctx.stats.table_hits += 1
+    if abs(entry.value) < 1 and entry.draft < ctx.root_empties - depth:
+        ctx.cut_off = True
+    return True
 
 
-def calc_score(board: Board, depth: int) -> int:
-    DEPTH_OFFSET = 10  # max of 9 deep because 3x3, so go one more
-    return utility(board) * (DEPTH_OFFSET - depth)
+def store(key: BoardKey, depth: int, ctx: SearchContext, value: float,
+          action: Optional[Action], alpha: float, beta: float):
+    """
+    Records a searched position in the transposition table.
+    """
+    flag = LOWER if value >= beta else UPPER if value <= alpha else EXACT
+    ctx.table[key] = TableEntry(ctx.draft(depth), flag, value, action)
 
 
-def max_value(board: Board, depth: int) -> ValuedAction:
-    if terminal(board):
-        return ValuedAction(calc_score(board, depth), None)
-    choices = []
-    for action in actions(board):
-        value = min_value(result(board, action), depth + 1).value
-        choices.append(ValuedAction(value, action))
-    return max(choices)
+def principal_variation(pos: Position, ctx: SearchContext,
+                        action: Optional[Action]) -> List[Action]:
+    """
+    Returns the best line of play from `pos` starting with `action`,
+    following the best moves recorded in the transposition table.
+    """
+    line = []
+    while action is not None and action in pos.actions():
+        line.append(action)
+        pos.make(action)
+        if pos.winner() is not None or ctx.table is None:
+            break
+        entry = ctx.table.get(pos.key)
+        action = entry.action if entry else None
+    for action in reversed(line):
+        pos.unmake(action)
+    return line
 
 
-def min_value(board: Board, depth: int) -> ValuedAction:
-    if terminal(board):
-        return ValuedAction(calc_score(board, depth), None)
-    choices = []
-    for action in actions(board):
-        value = max_value(result(board, action), depth + 1).value
-        choices.append(ValuedAction(value, action))
-    return min(choices)
+def search_max(pos: Position, depth: int, ctx: SearchContext,
+               alpha: float, beta: float, pv: Optional[List[Action]]) -> float:
+    """
+    Returns the value of a position with X to move, leaving its best
+    action in ctx.best_action.
+
+    Only plain floats pass between nodes, and the best action is tracked
+    in locals, so searching a node allocates little beyond its action list
+    and table entry. `pv` is indexed by depth and given only on the line.
+    """
+    score = leaf_score(pos, depth, ctx)
+    if score is not None:
+        ctx.best_action = None
+        return score
+    key = pos.key
+    hint = None
+    if ctx.table is not None:
+        entry = ctx.table.get(key)
+        hint = entry.action if entry else None
+        if probe(entry, depth, ctx):
+            value = entry.value
+            if entry.flag == EXACT or (depth and (
+                    (entry.flag == LOWER and value >= beta)
+                    or (entry.flag == UPPER and value <= alpha))):
+                ctx.best_action = hint
+                return value
+            # A narrowed root window could let a bound pass for the best move
+            if depth and entry.flag == LOWER and value > alpha:
+                alpha = value
+            elif depth and entry.flag == UPPER and value < beta:
+                beta = value
+    pv_move = pv[depth] if pv is not None and depth < len(pv) else None
+    lo, hi = alpha, beta  # the window searched, which the table entry's flag refers to
+    best_value = INT_MIN
+    best_action = None
+    stats = ctx.stats
+    for action in ordered_actions(pos.actions(), pv_move, hint):
+        pos.make(action)
+        start = time.perf_counter() if depth == 0 else 0.0
+        value = search_min(pos, depth + 1, ctx, alpha, beta,
+                           pv if pv_move is not None and action == pv_move else None)
+        if depth == 0:
+            stats.root_times[action] = (stats.root_times.get(action, 0.0)
+                                        + time.perf_counter() - start)
+        pos.unmake(action)
+        if value > best_value:
+            best_value = value
+            best_action = action
+            if value > alpha:
+                alpha = value
+                if alpha >= beta:
+                    stats.cutoffs += 1
+                    break
+    if ctx.table is not None:
+        store(key, depth, ctx, best_value, best_action, lo, hi)
+    ctx.best_action = best_action
+    return best_value
 
 
-def minimax(board: Board) -> Optional[Action]:
+def search_min(pos: Position, depth: int, ctx: SearchContext,
+               alpha: float, beta: float, pv: Optional[List[Action]]) -> float:
+    """
+    Returns the value of a position with O to move; see search_max.
+    """
+    score = leaf_score(pos, depth, ctx)
+    if score is not None:
+        ctx.best_action = None
+        return score
+    key = pos.key
+    hint = None
+    if ctx.table is not None:
+        entry = ctx.table.get(key)
+        hint = entry.action if entry else None
+        if probe(entry, depth, ctx):
+            value = entry.value
+            if entry.flag == EXACT or (depth and (
+                    (entry.flag == LOWER and value >= beta)
+                    or (entry.flag == UPPER and value <= alpha))):
+                ctx.best_action = hint
+                return value
+            if depth and entry.flag == LOWER and value > alpha:
+                alpha = value
+            elif depth and entry.flag == UPPER and value < beta:
+                beta = value
+    pv_move = pv[depth] if pv is not None and depth < len(pv) else None
+    lo, hi = alpha, beta  # the window searched, which the table entry's flag refers to
+    best_value = INT_MAX
+    best_action = None
+    stats = ctx.stats
+    for action in ordered_actions(pos.actions(), pv_move, hint):
+        pos.make(action)
+        start = time.perf_counter() if depth == 0 else 0.0
+        value = search_max(pos, depth + 1, ctx, alpha, beta,
+                           pv if pv_move is not None and action == pv_move else None)
+        if depth == 0:
+            stats.root_times[action] = (stats.root_times.get(action, 0.0)
+                                        + time.perf_counter() - start)
+        pos.unmake(action)
+        if value < best_value:
+            best_value = value
+            best_action = action
+            if value < beta:
+                beta = value
+                if alpha >= beta:
+                    stats.cutoffs += 1
+                    break
+    if ctx.table is not None:
+        store(key, depth, ctx, best_value, best_action, lo, hi)
+    ctx.best_action = best_action
+    return best_value
+
+
+def max_value(pos: Position, depth: int, ctx: SearchContext,
+              alpha: float = INT_MIN, beta: float = INT_MAX,
+              pv: Optional[List[Action]] = None) -> ValuedAction:
+    value = search_max(pos, depth, ctx, alpha, beta, pv)
+    action = ctx.best_action
+    return ValuedAction(value, action, principal_variation(pos, ctx, action))
+
+
+def min_value(pos: Position, depth: int, ctx: SearchContext,
+              alpha: float = INT_MIN, beta: float = INT_MAX,
+              pv: Optional[List[Action]] = None) -> ValuedAction:
+    value = search_min(pos, depth, ctx, alpha, beta, pv)
+    action = ctx.best_action
+    return ValuedAction(value, action, principal_variation(pos, ctx, action))
+
+
+def minimax(board: Board, k: int = K, depth_limit: Optional[int] = None,
+            table: Optional[TranspositionTable] = None,
+            stats: Optional[SearchStats] = None) -> Optional[Action]:
     """
     Returns the optimal action for the current player on the board.
+
+    With a `depth_limit`, positions that many plies ahead are scored
+    with `evaluate` instead of being searched to the end of the game.
+    Pass a `table` to keep the searched positions for later searches,
+    and `stats` to have the search's counters added to it.
+    """
+    if depth_limit is not None and depth_limit < 1:
+        raise ValueError("depth_limit must be at least 1")
+    if terminal(board, k):
+        return None
+    table = {} if table is None else table
+    find_best = max_value if player(board) == X else min_value
+    ctx = SearchContext(board, k, depth_limit, table=table, stats=stats)
+    return find_best(Position(board, k), 0, ctx).action
+
+
+def iterative_deepening(board: Board, k: int = K, time_budget: float = 1.0,
+                        max_depth: Optional[int] = None,
+                        table: Optional[TranspositionTable] = None,
+                        stats: Optional[SearchStats] = None,
+                        cancel: Optional[threading.Event] = None) -> Optional[Action]:
     """
-    if terminal(board):
+    Returns the best action found by searching one ply deeper at a time
+    until `time_budget` seconds have elapsed.
+
+    The move comes from the deepest search that completed. Each search
+    tries the previous one's best line first, so alpha-beta cuts more.
+    The first (one ply) search always runs to completion, so a move is
+    returned however small the budget.
+
+    Setting `cancel` from another thread abandons the search, which then
+    returns None.
+    """
+    if terminal(board, k):
         return None
+    deadline = time.monotonic() + time_budget
+    table = {} if table is None else table
     find_best = max_value if player(board) == X else min_value
-    return find_best(board, depth=0).action
+    max_depth = max_depth or sum(row.count(EMPTY) for row in board)
+    best = None
+    for depth_limit in range(1, max_depth + 1):
+        ctx = SearchContext(board, k, depth_limit, deadline if best else None, table, stats, cancel)
+        try:
+            # A fresh position each time: a timed out search leaves moves made
+            best = find_best(Position(board, k), 0, ctx, pv=best.line if best else None)
+        except SearchTimeout:
+            break
+        except SearchCancelled:
+            return None
+        # Stop once the search saw every ending or proved a win
+        if not ctx.cut_off or abs(best.value) >= 1:
+            break
+        if time.monotonic() > deadline:
+            break
+    return best.action
+
+
+def analyze(board: Board, k: int = K, depth_limit: Optional[int] = None,
+            time_budget: Optional[float] = None,
+            table: Optional[TranspositionTable] = None,
+            cancel: Optional[threading.Event] = None) -> Tuple[Optional[Action], SearchStats]:
+    """
+    Returns the best action together with statistics about the search.
+
+    With a `time_budget` this searches by iterative deepening (up to
+    `depth_limit` plies, and cancellable through `cancel`), otherwise by
+    minimax.
+    """
+    stats = SearchStats()
+    start = time.perf_counter()
+    if time_budget is None:
+        action = minimax(board, k, depth_limit, table, stats)
+    else:
+        action = iterative_deepening(board, k, time_budget, depth_limit, table, stats, cancel)
+    stats.elapsed = time.perf_counter() - start
+    return action, stats
+
+
+# Per-process transposition table used by parallel_minimax workers
+_worker_table: TranspositionTable = {}
+
+
+def _init_worker(table: TranspositionTable):
+    global _worker_table
+    _worker_table = dict(table)
+
+
+def _search_root_move(board: Board, action: Action, k: int, depth_limit: Optional[int],
+                      alpha: float, beta: float) -> Tuple[float, TranspositionTable, SearchStats]:
+    """
+    Searches the subtree below one root action in a worker process.
+
+    Returns the action's value, the table entries near the root, which
+    the parent merges so later searches (and workers) can reuse them,
+    and the search's counters.
+    """
+    ctx = SearchContext(board, k, depth_limit, table=_worker_table)
+    find_value = min_value if player(board) == X else max_value
+    pos = Position(board, k)
+    pos.make(action)
+    start = time.perf_counter()
+    value = find_value(pos, 1, ctx, alpha, beta).value
+    ctx.stats.root_times[action] = time.perf_counter() - start
+    min_draft = ctx.draft(1) - SHARED_PLIES
+    shared = {key: entry for key, entry in _worker_table.items() if entry.draft >= min_draft}
+    return value, shared, ctx.stats
+
+
+def parallel_minimax(board: Board, k: int = K, depth_limit: Optional[int] = None,
+                     workers: Optional[int] = None,
+                     table: Optional[TranspositionTable] = None,
+                     stats: Optional[SearchStats] = None) -> Optional[Action]:
+    """
+    Returns the optimal action for the current player, searching the root
+    actions in parallel across a pool of `workers` processes.
+
+    The first ("eldest brother") action is searched here to get a bound;
+    the remaining ("young brothers") then search in parallel against it.
+    Workers start from a copy of `table` and send back the entries near
+    their roots, which are merged into `table` for the next search.
+    """
+    if depth_limit is not None and depth_limit < 1:
+        raise ValueError("depth_limit must be at least 1")
+    if terminal(board, k):
+        return None
+    table = {} if table is None else table
+    maximizing = player(board) == X
+    pos = Position(board, k)
+    root = table.get(pos.key)
+    acts = ordered_actions(pos.actions(), None, root.action if root else None)
+
+    # Eldest brother
+    stats = SearchStats() if stats is None else stats
+    ctx = SearchContext(board, k, depth_limit, table=table, stats=stats)
+    find_value = min_value if maximizing else max_value
+    pos.make(acts[0])
+    start = time.perf_counter()
+    best_value = find_value(pos, 1, ctx).value
+    stats.root_times[acts[0]] = time.perf_counter() - start
+    best_action = acts[0]
+    if len(acts) == 1:
+        return best_action
+
+    # Young brothers only need to show they beat the eldest
+    alpha, beta = (best_value, INT_MAX) if maximizing else (INT_MIN, best_value)
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(table,)) as pool:
+        futures = {
+            pool.submit(_search_root_move, board, action, k, depth_limit, alpha, beta): action
+            for action in acts[1:]
+        }
+        for future in as_completed(futures):
+            value, shared, worker_stats = future.result()
+            table.update(shared)
+            stats.merge(worker_stats)
+            if (value > best_value) if maximizing else (value < best_value):
+                best_value, best_action = value, futures[future]
+    return best_action
+
+
+class Evaluation(NamedTuple):
+    value: float  # search score: positive favours X, magnitude >= 1 is a forced win
+    action: Optional[Action]  # best move, None if the game is over
+
+
+# Flat board contents: 0 for EMPTY, 1 for X, 2 for O
+Canonical = Tuple[int, ...]
+SolvedPositions = Dict[Tuple[int, int, int, Optional[int], Canonical], Evaluation]
+
+MARK_CODES = {EMPTY: 0, X: 1, O: 2}
+CODE_MARKS = {code: mark for mark, code in MARK_CODES.items()}
+
+
+@functools.lru_cache(maxsize=None)
+def symmetries(rows: int, cols: int) -> List[List[int]]:
+    """
+    Returns the board's symmetries (flips, plus rotations and transposes
+    when square) as permutations taking each flat cell index to its image.
+    """
+    n = rows - 1
+    m = cols - 1
+    maps = [
+        lambda i, j: (i, j),
+        lambda i, j: (n - i, j),
+        lambda i, j: (i, m - j),
+        lambda i, j: (n - i, m - j),
+    ]
+    if rows == cols:
+        maps += [
+            lambda i, j: (j, i),
+            lambda i, j: (j, n - i),
+            lambda i, j: (m - j, i),
+            lambda i, j: (m - j, n - i),
+        ]
+    perms = []
+    for to in maps:
+        perm = [0] * (rows * cols)
+        for i in range(rows):
+            for j in range(cols):
+                ti, tj = to(i, j)
+                perm[i * cols + j] = ti * cols + tj
+        perms.append(perm)
+    return perms
+
+
+def canonical(board: Board) -> Tuple[Canonical, List[int]]:
+    """
+    Returns the smallest flat encoding of the board over its symmetries,
+    and the permutation that produces it from the board.
+    """
+    flat = [MARK_CODES[mark] for row in board for mark in row]
+    best = None
+    best_perm = None
+    for perm in symmetries(len(board), len(board[0])):
+        image = [0] * len(flat)
+        for index, code in enumerate(flat):
+            image[perm[index]] = code
+        image = tuple(image)
+        if best is None or image < best:
+            best, best_perm = image, perm
+    return best, best_perm
+
+
+def bitboards(board: Board) -> Tuple[int, int]:
+    """
+    Returns bitmasks of the cells (row-major, bit 0 first) holding X and O.
+    """
+    x_bits = o_bits = 0
+    bit = 1
+    for row in board:
+        for mark in row:
+            if mark == X:
+                x_bits |= bit
+            elif mark == O:
+                o_bits |= bit
+            bit <<= 1
+    return x_bits, o_bits
+
+
+@functools.lru_cache(maxsize=None)
+def window_masks(rows: int, cols: int, k: int) -> List[int]:
+    """
+    Returns a bitmask per k-cell window, matching bitboards' layout.
+    """
+    return [sum(1 << (i * cols + j) for i, j in line) for line in windows(rows, cols, k)]
+
+
+def winners_many(bits: Sequence[Tuple[int, int]], rows: int, cols: int,
+                 k: int = K) -> List[Optional[str]]:
+    """
+    Returns the winner of each board given as (X, O) bitboards.
+
+    The masks are checked for all boards at once with numpy when it is
+    installed and the boards fit in 64 bits.
+    """
+    masks = window_masks(rows, cols, k)
+    if not bits or not masks:
+        return [None] * len(bits)
+    if np is not None and rows * cols <= NUMPY_MAX_CELLS:
+        mask_array = np.array(masks, dtype=np.uint64)
+        x_array = np.array([x_bits for x_bits, _ in bits], dtype=np.uint64)[:, None]
+        o_array = np.array([o_bits for _, o_bits in bits], dtype=np.uint64)[:, None]
+        x_wins = ((x_array & mask_array) == mask_array).any(axis=1)
+        o_wins = ((o_array & mask_array) == mask_array).any(axis=1)
+        return [X if x_won else O if o_won else None
+                for x_won, o_won in zip(x_wins.tolist(), o_wins.tolist())]
+    champs = []
+    for x_bits, o_bits in bits:
+        if any(x_bits & mask == mask for mask in masks):
+            champs.append(X)
+        elif any(o_bits & mask == mask for mask in masks):
+            champs.append(O)
+        else:
+            champs.append(None)
+    return champs
+
+
+def evaluate_many(boards: Sequence[Board], k: int = K, depth_limit: Optional[int] = None,
+                  cache: Optional[SolvedPositions] = None) -> List[Evaluation]:
+    """
+    Returns the minimax value and best action of every board, in input order.
+
+    Boards equal up to rotation or reflection are solved once, through one
+    transposition table per board shape, and finished games are detected
+    for the whole batch at once. Pass a `cache` to keep solved positions
+    for later calls.
+    """
+    if depth_limit is not None and depth_limit < 1:
+        raise ValueError("depth_limit must be at least 1")
+    cache = {} if cache is None else cache
+    tables: Dict[Tuple[int, int], TranspositionTable] = {}
+    keys = []
+    perms = []
+    unsolved: Dict[Tuple, Board] = {}
+    for board in boards:
+        rows, cols = len(board), len(board[0])
+        image, perm = canonical(board)
+        key = (rows, cols, k, depth_limit, image)
+        keys.append(key)
+        perms.append(perm)
+        if key not in cache:
+            unsolved[key] = [[CODE_MARKS[image[i * cols + j]] for j in range(cols)]
+                             for i in range(rows)]
+
+    # Batch the game-over check by board shape
+    by_shape: Dict[Tuple[int, int], List[Tuple]] = {}
+    for key in unsolved:
+        by_shape.setdefault(key[:2], []).append(key)
+    for (rows, cols), shape_keys in by_shape.items():
+        bits = [bitboards(unsolved[key]) for key in shape_keys]
+        full = (1 << (rows * cols)) - 1
+        for key, (x_bits, o_bits), champ in zip(shape_keys, bits,
+                                                 winners_many(bits, rows, cols, k)):
+            if champ is not None:
+                marks = bin(x_bits | o_bits).count("1")
+                score = (1 if champ == X else -1) * (rows * cols + 1 - marks)
+                cache[key] = Evaluation(score, None)
+            elif x_bits | o_bits == full:
+                cache[key] = Evaluation(0, None)
+
+    # Search what is left, sharing a table between boards of the same shape
+    for key, board in unsolved.items():
+        if key in cache:
+            continue
+        table = tables.setdefault(key[:2], {})
+        ctx = SearchContext(board, k, depth_limit, table=table)
+        find_best = max_value if player(board) == X else min_value
+        best = find_best(Position(board, k), 0, ctx)
+        cache[key] = Evaluation(best.value, best.action)
+
+    # Map each canonical best action back onto the board it came from
+    evaluations = []
+    for board, key, perm in zip(boards, keys, perms):
+        solved = cache[key]
+        action = solved.action
+        if action is not None:
+            cols = len(board[0])
+            index = perm.index(action[0] * cols + action[1])
+            action = divmod(index, cols)
+        evaluations.append(Evaluation(solved.value, action))
+    return evaluations
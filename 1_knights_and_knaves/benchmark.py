@@ -0,0 +1,154 @@
+"""
+Benchmarks for the logic entailment engines.
+
+Usage: python benchmark.py engines [--statements M] [--puzzles P] [--seed SEED]
+                                   [--parallel-min-symbols S]
+                                   [--engine ENGINE ...] [N ...]
+       python benchmark.py formats [--seed SEED] [N ...]
+
+N is a number of characters. Each engine solves generated puzzles with
+N characters, asking model_check about every Knight and Knave symbol,
+as puzzle.py once did; "kb" asks an incremental KnowledgeBase instead,
+"diagram" a DecisionDiagram compiled once, and "many" asks
+model_check_many about all the symbols at once.
+Engines are skipped at sizes beyond their MAX_SYMBOLS. The parallel
+engine checks serially below logic.PARALLEL_MIN_SYMBOLS, which the
+benchmark sets to S (default 0, so that it always uses its process
+pool); the path column shows which it took. Memory is the
+peak traced by tracemalloc in this process, so it leaves out the
+workers of the parallel engine.
+
+The formats benchmark compares ways of storing a generated puzzle's
+knowledge: its size as formula text, as dumps bytes and pickled, and
+the seconds to read each back, against generating the puzzle again.
+"""
+
+import argparse
+import gc
+import pickle
+import random
+import time
+import tracemalloc
+
+import generator
+import logic
+from logic import (ENGINES, DecisionDiagram, KnowledgeBase, dumps, loads, model_check,
+                   model_check_many, parse_formula)
+
+# Ways to solve a puzzle besides one model_check per symbol
+EXTRA_ENGINES = ["kb", "diagram", "many"]
+
+DEFAULT_SIZES = [3, 4, 6, 8, 10, 12, 16, 24, 32]
+FORMAT_SIZES = [32, 128, 512]
+
+# The most symbols (twice the characters) each engine is asked to handle;
+# beyond them enumerating every model takes minutes
+MAX_SYMBOLS = {
+    "enumerate": 16,
+    "compiled": 20,
+    "bitwise": 24,
+    "parallel": 24,
+}
+
+
+def solve(puzzle, engine):
+    """Returns the set of the puzzle's symbols that `engine` finds entailed."""
+    if engine in ("kb", "diagram"):
+        kb = (KnowledgeBase if engine == "kb" else DecisionDiagram)(puzzle.knowledge)
+        return {symbol for symbol in puzzle.symbols if kb.entails(symbol)}
+    if engine == "many":
+        entailed = model_check_many(puzzle.knowledge, puzzle.symbols)
+        return {symbol for symbol, yes in zip(puzzle.symbols, entailed) if yes}
+    return {symbol for symbol in puzzle.symbols
+            if model_check(puzzle.knowledge, symbol, engine)}
+
+
+def measure(puzzles, engine):
+    """
+    Returns the seconds taken to solve `puzzles` with `engine` and the
+    peak traced memory in bytes while solving one.
+    """
+    start = time.perf_counter()
+    for puzzle in puzzles:
+        if solve(puzzle, engine) != puzzle.solution:
+            raise AssertionError(f"{engine} solved a puzzle wrongly")
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    solve(puzzles[0], engine)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def bench_engines(args):
+    print(f"Solving {args.puzzles} generated puzzles per size, "
+          f"{args.statements or 'twice the characters in'} statements each")
+    print(f"{'chars':>6} {'symbols':>8} {'engine':>10} {'path':>6} {'seconds':>9} "
+          f"{'peak KiB':>9}")
+    logic.PARALLEL_MIN_SYMBOLS = args.parallel_min_symbols
+    rng = random.Random(args.seed)
+    for count in args.sizes:
+        puzzles = [generator.generate(count, args.statements, rng) for _ in range(args.puzzles)]
+        for engine in args.engines:
+            if 2 * count > MAX_SYMBOLS.get(engine, 2 * count):
+                continue
+            path = ""
+            if engine == "parallel":
+                path = "pool" if 2 * count >= logic.PARALLEL_MIN_SYMBOLS else "serial"
+            seconds, peak = measure(puzzles, engine)
+            print(f"{count:>6} {2 * count:>8} {engine:>10} {path:>6} {seconds:>9.3f} "
+                  f"{peak / 1024:>9.1f}")
+
+
+def bench_formats(args):
+    print("Storing a generated puzzle's knowledge")
+    print(f"{'chars':>6} {'format':>8} {'bytes':>10} {'read s':>8}")
+    for count in args.sizes:
+        start = time.perf_counter()
+        knowledge = generator.generate(count, 3 * count, random.Random(args.seed)).knowledge
+        print(f"{count:>6} {'generate':>8} {'':>10} {time.perf_counter() - start:>8.3f}")
+        stored = {
+            "formula": (knowledge.formula().encode(),
+                        lambda data: parse_formula(data.decode())),
+            "dumps": (dumps(knowledge), loads),
+            "pickle": (pickle.dumps(knowledge), pickle.loads),
+        }
+        del knowledge
+        for name, (data, read) in stored.items():
+            gc.collect()  # so that reading builds every node anew
+            start = time.perf_counter()
+            read(data)
+            print(f"{count:>6} {name:>8} {len(data):>10} {time.perf_counter() - start:>8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    engines = commands.add_parser("engines", help="time and memory per engine as puzzles grow")
+    engines.add_argument("--statements", type=int, default=None,
+                         help="statements per puzzle (default: twice the characters)")
+    engines.add_argument("--puzzles", type=int, default=3, help="puzzles per size")
+    engines.add_argument("--seed", type=int, default=None)
+    engines.add_argument("--parallel-min-symbols", type=int, default=0,
+                         help="symbols from which the parallel engine uses its process pool "
+                              "(default: 0, always)")
+    engines.add_argument("--engine", dest="engines", action="append",
+                         choices=sorted(ENGINES) + EXTRA_ENGINES,
+                         help="engine to compare (default: all, and the extras)")
+    engines.add_argument("sizes", nargs="*", type=int, default=DEFAULT_SIZES)
+    engines.set_defaults(run=bench_engines)
+
+    formats = commands.add_parser("formats", help="size and reading time of stored knowledge")
+    formats.add_argument("--seed", type=int, default=0)
+    formats.add_argument("sizes", nargs="*", type=int, default=FORMAT_SIZES)
+    formats.set_defaults(run=bench_formats)
+
+    args = parser.parse_args()
+    if args.command == "engines":
+        args.engines = args.engines or list(ENGINES) + EXTRA_ENGINES
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Random knights-and-knaves puzzles.
+
+Usage: python generator.py [--characters N] [--statements M] [--seed SEED]
+                           [--directory DIR --puzzles P]
+
+A puzzle is written as its statements, one per line, followed by its
+solution in comments; parse reads such text back. With --directory,
+P puzzles are written there as puzzle0.txt, puzzle1.txt and so on.
+
+Every puzzle has exactly one solution: the characters' kinds are drawn
+first, each statement is one its speaker could make (true if a knight,
+false if a knave), and puzzles whose statements leave some character
+undetermined are drawn again.
+"""
+
+import argparse
+import collections
+import os
+import random
+import re
+import string
+
+from logic import And, Biconditional, Implication, KnowledgeBase, Not, Or, Symbol
+
+Puzzle = collections.namedtuple("Puzzle", ["knowledge", "symbols", "solution", "statements"])
+Puzzle.__doc__ = """
+A puzzle: knowledge is its Sentence, symbols the Knight and Knave symbol
+of every character in turn, solution the set of symbols that are true,
+and statements what each speaker says, in words.
+"""
+
+Character = collections.namedtuple("Character", ["name", "knight", "knave"])
+
+# What a speaker may claim about characters x and y: the claim as a
+# sentence over their Knight and Knave symbols, and in words
+CLAIMS = [
+    (lambda x, y: x.knight, "{x} is a knight."),
+    (lambda x, y: x.knave, "{x} is a knave."),
+    (lambda x, y: And(x.knave, y.knave), "{x} and {y} are both knaves."),
+    (lambda x, y: Biconditional(x.knight, y.knight), "{x} and {y} are the same kind."),
+    (lambda x, y: Not(Biconditional(x.knight, y.knight)), "{x} and {y} are of different kinds."),
+    (lambda x, y: Or(x.knight, y.knight), "{x} or {y} is a knight."),
+    (lambda x, y: Implication(x.knight, y.knave), "If {x} is a knight, {y} is a knave."),
+]
+
+
+def names(count):
+    """Returns `count` character names: A to Z, then A1 to Z1, and so on."""
+    letters = string.ascii_uppercase
+    return [letters[i % 26] + (str(i // 26) if i >= 26 else "") for i in range(count)]
+
+
+def character(name):
+    """Returns the character `name` with its Knight and Knave symbols."""
+    return Character(name, Symbol(f"{name} is a Knight"), Symbol(f"{name} is a Knave"))
+
+
+def characters(count):
+    """Returns `count` characters with their Knight and Knave symbols."""
+    return [character(name) for name in names(count)]
+
+
+def statement(rng, cast, model):
+    """
+    Returns a random (speaker, claim, words) statement by one of `cast`
+    that is consistent with `model`, the characters' true kinds.
+    """
+    speaker = rng.choice(cast)
+    while True:
+        x, y = rng.sample(cast, 2) if len(cast) > 1 else (cast[0], cast[0])
+        claim, words = rng.choice(CLAIMS)
+        claim = claim(x, y)
+        if claim.evaluate(model) == model[speaker.knight.name]:
+            return speaker, claim, f'{speaker.name} says "{words.format(x=x.name, y=y.name)}"'
+
+
+def generate(count, statements=None, rng=None, attempts=100):
+    """
+    Returns a random Puzzle with `count` characters and `statements`
+    statements (by default twice as many) and exactly one solution.
+
+    Raises ValueError if no puzzle of `attempts` drawn had a unique
+    solution, as happens when there are too few statements.
+    """
+    statements = 2 * count if statements is None else statements
+    rng = rng or random.Random()
+    cast = characters(count)
+    base_rules = [Biconditional(c.knight, Not(c.knave)) for c in cast]
+    symbols = [symbol for c in cast for symbol in (c.knight, c.knave)]
+    for _ in range(attempts):
+        kinds = {c.knight if rng.random() < 0.5 else c.knave for c in cast}
+        model = {symbol.name: symbol in kinds for symbol in symbols}
+        said = [statement(rng, cast, model) for _ in range(statements)]
+        knowledge = And(*base_rules, *[Biconditional(speaker.knight, claim)
+                                       for speaker, claim, _ in said])
+        kb = KnowledgeBase(knowledge)
+        if all(kb.entails(symbol) for symbol in kinds):
+            return Puzzle(knowledge, symbols, kinds, [words for _, _, words in said])
+    raise ValueError(f"no puzzle with {count} characters and {statements} statements "
+                     f"had a unique solution in {attempts} attempts")
+
+
+def text(puzzle):
+    """Returns a puzzle as text: its statements, then its solution in comments."""
+    lines = puzzle.statements + ["# Solution"]
+    lines += [f"#     {symbol}" for symbol in puzzle.symbols if symbol in puzzle.solution]
+    return "\n".join(lines) + "\n"
+
+
+# Statements as parse reads them: the speaker, then a claim of CLAIMS
+PATTERNS = [
+    (re.compile(r'(?P<speaker>\w+) says "'
+                + re.escape(words).replace(r"\{x\}", r"(?P<x>\w+)").replace(r"\{y\}", r"(?P<y>\w+)")
+                + '"'),
+     claim)
+    for claim, words in CLAIMS
+]
+
+
+def parse(contents):
+    """
+    Returns the Puzzle whose statements are the lines of `contents`, as
+    text writes them; blank lines and # comments are skipped. Its symbols are
+    those of the characters in order of appearance, and its solution is
+    None.
+
+    Raises ValueError for a line that is not a known statement.
+    """
+    cast = dict()  # name -> character
+
+    def meet(name):
+        return cast.setdefault(name, character(name))
+
+    said = []
+    for number, line in enumerate(contents.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        for pattern, claim in PATTERNS:
+            match = pattern.fullmatch(line)
+            if match:
+                break
+        else:
+            raise ValueError(f"line {number}: not a statement: {line!r}")
+        found = match.groupdict()
+        speaker, x = meet(found["speaker"]), meet(found["x"])
+        y = meet(found["y"]) if "y" in found else None
+        said.append((speaker, claim(x, y), line))
+    knowledge = And(*[Biconditional(c.knight, Not(c.knave)) for c in cast.values()],
+                    *[Biconditional(speaker.knight, claim) for speaker, claim, _ in said])
+    symbols = [symbol for c in cast.values() for symbol in (c.knight, c.knave)]
+    return Puzzle(knowledge, symbols, None, [words for _, _, words in said])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--characters", type=int, default=3)
+    parser.add_argument("--statements", type=int, default=None,
+                        help="statements (default: twice the characters)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--directory", default=None, help="write puzzle files here")
+    parser.add_argument("--puzzles", type=int, default=10,
+                        help="puzzle files to write (default: 10)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if args.directory is None:
+        print(text(generate(args.characters, args.statements, rng)), end="")
+        return
+    os.makedirs(args.directory, exist_ok=True)
+    for i in range(args.puzzles):
+        with open(os.path.join(args.directory, f"puzzle{i}.txt"), "w") as f:
+            f.write(text(generate(args.characters, args.statements, rng)))
+
+
+if __name__ == "__main__":
+    main()
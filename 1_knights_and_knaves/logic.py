@@ -1,19 +1,200 @@
+import heapq
 import itertools
+import multiprocessing
+import os
+import re
+import weakref
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    import numpy as np
+except ImportError:  # bit-parallel checks fall back to Python integers
+    np = None
+
+# Symbols evaluated side by side as bits of one Python integer (2^20 models)
+INT_CHUNK_SYMBOLS = 20
+
+# Symbols evaluated side by side in one NumPy array of words (2^24 models)
+NUMPY_CHUNK_SYMBOLS = 24
+
+# Parallel model checking splits the models into about this many partitions
+# per worker, so that workers finishing early can take more
+PARTITIONS_PER_WORKER = 4
+
+# Fewer symbols than this are checked serially, since starting the worker
+# processes would take longer than checking every model
+PARALLEL_MIN_SYMBOLS = 26
 
 
 class Sentence():
+    """
+    A logical sentence. Sentences are immutable and hash-consed: building
+    a sentence equal to an existing one returns the existing node, so equal
+    sentences are identical, compare in constant time and share memory.
+    Each node caches its hash, its symbols and its depth.
+
+    Walks over a sentence (evaluate, formula, repr, encoding, simplifying)
+    visit its distinct subsentences with an explicit stack, see fold, so
+    formulas nested far beyond Python's recursion limit work too.
+    """
+
+    __slots__ = ("__weakref__", "_key", "_hash", "_symbols", "_depth")
+
+    # (class, *arguments) -> the live sentence built from them
+    interned = weakref.WeakValueDictionary()
+
+    # sentence -> compiled function of a model dict, for evaluate
+    evaluators = weakref.WeakKeyDictionary()
+
+    # Whether a subclass's one slot holds all its arguments, else one each
+    variadic = False
+
+    @classmethod
+    def node(cls, *args, symbols=None):
+        """
+        Returns the sentence of this class with arguments `args`, creating
+        it if need be. The arguments fill the subclass's slots, and its
+        symbols are `symbols`, or else the union of the arguments' symbols.
+        """
+        key = (cls,) + args
+        node = Sentence.interned.get(key)
+        if node is None:
+            node = object.__new__(cls)
+            if symbols is None:
+                symbols = frozenset().union(*[arg._symbols for arg in args])
+                depth = 1 + max([arg._depth for arg in args], default=0)
+            else:
+                depth = 0
+            object.__setattr__(node, "_key", key)
+            if cls.variadic:
+                object.__setattr__(node, cls.__slots__[0], args)
+            else:
+                for name, value in zip(cls.__slots__, args):
+                    object.__setattr__(node, name, value)
+            object.__setattr__(node, "_hash", hash(key))
+            object.__setattr__(node, "_symbols", symbols)
+            object.__setattr__(node, "_depth", depth)
+            Sentence.interned[key] = node
+        return node
+
+    def __hash__(self):
+        return self._hash
+
+    def __setattr__(self, name, value):
+        raise AttributeError("sentences are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("sentences are immutable")
+
+    def __reduce__(self):
+        return (loads, (dumps(self),))
+
+    def __repr__(self):
+        return fold(self, lambda node, parts: node.describe(parts))
+
+    def children(self):
+        """Returns the sentences the logical sentence is built from."""
+        return ()
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
-        raise Exception("nothing to evaluate")
+        try:
+            evaluator = Sentence.evaluators[self]
+        except KeyError:
+            lines, result = source(self, lambda name: f"m[{name!r}]")
+            evaluator = Sentence.evaluators[self] = define("m", lines, result)
+        try:
+            return bool(evaluator(model))
+        except KeyError as e:
+            raise Exception(f"variable {e.args[0]} not in model")
+
+    def partial(self, model):
+        """
+        Evaluates the logical sentence in a model that may leave symbols
+        unassigned; returns None if the value depends on them.
+        """
+        if self._depth <= MAX_NESTING:
+            return self.kleene(model)
+        return fold(self, lambda node, values: node.settle(values, model))
 
     def formula(self):
         """Returns string formula representing logical sentence."""
-        return ""
+        reprs = dict()
+
+        def describe(node):
+            return fold(node, lambda n, parts: n.describe(parts), reprs)
+
+        return fold(self, lambda node, parts: node.join(parts, describe))
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozen set of all symbols in the logical sentence."""
+        return frozenset()
+
+    def bits(self, masks, full):
+        """
+        Evaluates the logical sentence in many models at once. Symbol
+        `name` is true in the models whose bits are set in `masks[name]`,
+        and `full` has a bit set for every model.
+        """
+        return fold(self, lambda node, values: node.combine(values, masks, full))
+
+    # Each of the following computes one step of a walk over a sentence,
+    # for this node, from the results `parts` for its children
+
+    def describe(self, parts):
+        """Returns the repr of the logical sentence."""
+        return object.__repr__(self)
+
+    def join(self, parts, describe):
+        """
+        Returns the formula of the logical sentence, given its children's
+        formulas and a function returning any sentence's repr.
+        """
+        return ""
+
+    def kleene(self, model):
+        """
+        Computes partial by recursion, skipping parts once the value is
+        known; for sentences no deeper than MAX_NESTING.
+        """
+        raise Exception("nothing to evaluate")
+
+    def settle(self, values, model):
+        """Returns the partial value of the logical sentence; see partial."""
+        raise Exception("nothing to evaluate")
+
+    def expression(self, parts):
+        """Returns a Python expression for the logical sentence."""
+        raise Exception("nothing to compile")
+
+    def bit_expression(self, parts):
+        """
+        Returns a Python expression for the logical sentence's models, as
+        bitwise operations on masks, where `full` is the mask of all models.
+        """
+        raise Exception("nothing to compile")
+
+    def combine(self, values, masks, full):
+        """Returns the mask of the logical sentence's models; see bits."""
+        raise Exception("nothing to evaluate")
+
+    def encode(self, cnf, literals):
+        """
+        Adds clauses defining a variable equivalent to the logical sentence
+        to `cnf` and returns its literal.
+        """
+        raise Exception("nothing to encode")
+
+    def diagram(self, bdd, parts):
+        """Returns the node of the logical sentence in `bdd`."""
+        raise Exception("nothing to diagram")
+
+    def simplified(self, parts, cache):
+        """
+        Returns an equivalent sentence built from the simplified parts of
+        the logical sentence; see simplify.
+        """
+        return self
 
     @classmethod
     def validate(cls, sentence):
@@ -43,15 +224,10 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
-    def __init__(self, name):
-        self.name = name
-
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
-
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __new__(cls, name):
+        return cls.node(name, symbols=frozenset([name]))
 
     def __repr__(self):
         return self.name
@@ -62,170 +238,780 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def kleene(self, model):
+        return model.get(self.name)
+
+    def settle(self, values, model):
+        return model.get(self.name)
+
     def formula(self):
         return self.name
 
     def symbols(self):
-        return {self.name}
+        return self._symbols
+
+    def describe(self, parts):
+        return self.name
+
+    def join(self, parts, describe):
+        return self.name
+
+    def combine(self, values, masks, full):
+        return masks[self.name]
+
+    def encode(self, cnf, literals):
+        return cnf.variable(self.name)
+
+    def diagram(self, bdd, parts):
+        return bdd.variable(self.name)
 
 
 class Not(Sentence):
-    def __init__(self, operand):
+    __slots__ = ("operand",)
+
+    def __new__(cls, operand):
         Sentence.validate(operand)
-        self.operand = operand
+        return cls.node(operand)
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+    def children(self):
+        return (self.operand,)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def kleene(self, model):
+        value = self.operand.kleene(model)
+        return None if value is None else not value
 
-    def __repr__(self):
-        return f"Not({self.operand})"
+    def settle(self, values, model):
+        return None if values[0] is None else not values[0]
 
-    def evaluate(self, model):
-        return not self.operand.evaluate(model)
+    def symbols(self):
+        return self._symbols
 
-    def formula(self):
-        return "¬" + Sentence.parenthesize(self.operand.formula())
+    def describe(self, parts):
+        return f"Not({parts[0]})"
 
-    def symbols(self):
-        return self.operand.symbols()
+    def join(self, parts, describe):
+        return "¬" + wrap(self.operand, parts[0])
+
+    def expression(self, parts):
+        return f"(not {parts[0]})"
+
+    def bit_expression(self, parts):
+        return f"(full ^ {parts[0]})"
+
+    def combine(self, values, masks, full):
+        return full ^ values[0]
+
+    def encode(self, cnf, literals):
+        return -literals[0]
+
+    def diagram(self, bdd, parts):
+        return bdd.negate(parts[0])
+
+    def simplified(self, parts, cache):
+        operand = parts[0]
+        if isinstance(operand, Not):
+            return operand.operand
+        if operand is TRUE:
+            return FALSE
+        if operand is FALSE:
+            return TRUE
+        return Not(operand)
 
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+    __slots__ = ("conjuncts",)
+    variadic = True
+
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
+        return cls.node(*conjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+    def add(self, conjunct):
+        """Returns the conjunction with `conjunct` added; self is unchanged."""
+        return And(*self.conjuncts, conjunct)
 
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+    def children(self):
+        return self.conjuncts
 
-    def __repr__(self):
-        conjunctions = ", ".join(
-            [str(conjunct) for conjunct in self.conjuncts]
-        )
-        return f"And({conjunctions})"
+    def kleene(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.kleene(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
 
-    def add(self, conjunct):
-        Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+    def settle(self, values, model):
+        return False if False in values else None if None in values else True
 
-    def evaluate(self, model):
-        return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
+    def symbols(self):
+        return self._symbols
 
-    def formula(self):
-        if len(self.conjuncts) == 1:
-            return self.conjuncts[0].formula()
-        return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
-                           for conjunct in self.conjuncts])
+    def describe(self, parts):
+        conjunctions = ", ".join(parts)
+        return f"And({conjunctions})"
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def join(self, parts, describe):
+        if not self.conjuncts:
+            return describe(self)
+        if len(self.conjuncts) == 1:
+            return parts[0]
+        return " ∧ ".join([wrap(conjunct, part)
+                           for conjunct, part in zip(self.conjuncts, parts)])
+
+    def expression(self, parts):
+        if not parts:
+            return "True"
+        return "(" + " and ".join(parts) + ")"
+
+    def bit_expression(self, parts):
+        if not parts:
+            return "full"
+        return "(" + " & ".join(parts) + ")"
+
+    def combine(self, values, masks, full):
+        result = full
+        for value in values:
+            result = result & value
+        return result
+
+    def encode(self, cnf, literals):
+        return cnf.define_and(literals)
+
+    def diagram(self, bdd, parts):
+        return bdd.combine("and", parts, self.conjuncts)
+
+    def simplified(self, parts, cache):
+        conjuncts = dict()  # an ordered set
+        for conjunct in parts:
+            for part in (conjunct.conjuncts if isinstance(conjunct, And) else [conjunct]):
+                if part is FALSE or complemented(part, conjuncts):
+                    return FALSE
+                conjuncts[part] = None
+        # Absorption: A ∧ (A ∨ B) is A
+        conjuncts = [part for part in conjuncts
+                     if not (isinstance(part, Or)
+                             and any(disjunct in conjuncts for disjunct in part.disjuncts))]
+        return conjuncts[0] if len(conjuncts) == 1 else And(*conjuncts)
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    __slots__ = ("disjuncts",)
+    variadic = True
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
+        return cls.node(*disjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+    def children(self):
+        return self.disjuncts
 
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+    def kleene(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.kleene(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
 
-    def __repr__(self):
-        disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
-        return f"Or({disjuncts})"
+    def settle(self, values, model):
+        return True if True in values else None if None in values else False
 
-    def evaluate(self, model):
-        return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
+    def symbols(self):
+        return self._symbols
 
-    def formula(self):
-        if len(self.disjuncts) == 1:
-            return self.disjuncts[0].formula()
-        return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
-                            for disjunct in self.disjuncts])
+    def describe(self, parts):
+        disjuncts = ", ".join(parts)
+        return f"Or({disjuncts})"
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def join(self, parts, describe):
+        if not self.disjuncts:
+            return describe(self)
+        if len(self.disjuncts) == 1:
+            return parts[0]
+        return " ∨  ".join([wrap(disjunct, part)
+                            for disjunct, part in zip(self.disjuncts, parts)])
+
+    def expression(self, parts):
+        if not parts:
+            return "False"
+        return "(" + " or ".join(parts) + ")"
+
+    def bit_expression(self, parts):
+        if not parts:
+            return "0"
+        return "(" + " | ".join(parts) + ")"
+
+    def combine(self, values, masks, full):
+        result = 0
+        for value in values:
+            result = result | value
+        return result
+
+    def encode(self, cnf, literals):
+        return -cnf.define_and([-literal for literal in literals])
+
+    def diagram(self, bdd, parts):
+        return bdd.combine("or", parts, self.disjuncts)
+
+    def simplified(self, parts, cache):
+        disjuncts = dict()  # an ordered set
+        for disjunct in parts:
+            for part in (disjunct.disjuncts if isinstance(disjunct, Or) else [disjunct]):
+                if part is TRUE or complemented(part, disjuncts):
+                    return TRUE
+                disjuncts[part] = None
+        # Absorption: A ∨ (A ∧ B) is A
+        disjuncts = [part for part in disjuncts
+                     if not (isinstance(part, And)
+                             and any(conjunct in disjuncts for conjunct in part.conjuncts))]
+        return disjuncts[0] if len(disjuncts) == 1 else Or(*disjuncts)
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
+        return cls.node(antecedent, consequent)
 
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+    def children(self):
+        return (self.antecedent, self.consequent)
 
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    def kleene(self, model):
+        antecedent = self.antecedent.kleene(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.kleene(model)
+        if consequent is True:
+            return True
+        if antecedent is None or consequent is None:
+            return None
+        return False
 
-    def __repr__(self):
-        return f"Implication({self.antecedent}, {self.consequent})"
+    def settle(self, values, model):
+        antecedent, consequent = values
+        if antecedent is False or consequent is True:
+            return True
+        if antecedent is None or consequent is None:
+            return None
+        return False
 
-    def evaluate(self, model):
-        return ((not self.antecedent.evaluate(model))
-                or self.consequent.evaluate(model))
+    def symbols(self):
+        return self._symbols
 
-    def formula(self):
-        antecedent = Sentence.parenthesize(self.antecedent.formula())
-        consequent = Sentence.parenthesize(self.consequent.formula())
+    def describe(self, parts):
+        return f"Implication({parts[0]}, {parts[1]})"
+
+    def join(self, parts, describe):
+        antecedent = wrap(self.antecedent, parts[0])
+        consequent = wrap(self.consequent, parts[1])
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def expression(self, parts):
+        return f"(not {parts[0]} or {parts[1]})"
+
+    def bit_expression(self, parts):
+        return f"((full ^ {parts[0]}) | {parts[1]})"
+
+    def combine(self, values, masks, full):
+        return (full ^ values[0]) | values[1]
+
+    def encode(self, cnf, literals):
+        return -cnf.define_and([literals[0], -literals[1]])
+
+    def diagram(self, bdd, parts):
+        return bdd.apply("or", bdd.negate(parts[0]), parts[1])
+
+    def simplified(self, parts, cache):
+        antecedent, consequent = parts
+        if antecedent is TRUE:
+            return consequent
+        if antecedent is FALSE or consequent is TRUE or antecedent is consequent:
+            return TRUE
+        if consequent is FALSE:
+            return simplify(Not(antecedent), cache)
+        return Implication(antecedent, consequent)
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
+        return cls.node(left, right)
 
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+    def children(self):
+        return (self.left, self.right)
 
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    def kleene(self, model):
+        left = self.left.kleene(model)
+        if left is None:
+            return None
+        right = self.right.kleene(model)
+        return None if right is None else left == right
 
-    def __repr__(self):
-        return f"Biconditional({self.left}, {self.right})"
+    def settle(self, values, model):
+        left, right = values
+        return None if left is None or right is None else left == right
 
-    def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
+    def symbols(self):
+        return self._symbols
 
-    def formula(self):
-        left = Sentence.parenthesize(str(self.left))
-        right = Sentence.parenthesize(str(self.right))
-        return f"{left} <=> {right}"
+    def describe(self, parts):
+        return f"Biconditional({parts[0]}, {parts[1]})"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+    def join(self, parts, describe):
+        # The operands are shown by their reprs
+        left = wrap(self.left, describe(self.left), formula=False)
+        right = wrap(self.right, describe(self.right), formula=False)
+        return f"{left} <=> {right}"
 
+    def expression(self, parts):
+        return f"((not {parts[0]}) == (not {parts[1]}))"
+
+    def bit_expression(self, parts):
+        return f"(full ^ {parts[0]} ^ {parts[1]})"
+
+    def combine(self, values, masks, full):
+        return full ^ values[0] ^ values[1]
+
+    def encode(self, cnf, literals):
+        return cnf.define_equal(literals[0], literals[1])
+
+    def diagram(self, bdd, parts):
+        return bdd.negate(bdd.apply("xor", parts[0], parts[1]))
+
+    def simplified(self, parts, cache):
+        left, right = parts
+        if left is right:
+            return TRUE
+        if complemented(left, {right: None}):
+            return FALSE
+        if left is TRUE:
+            return right
+        if right is TRUE:
+            return left
+        if left is FALSE:
+            return simplify(Not(right), cache)
+        if right is FALSE:
+            return simplify(Not(left), cache)
+        return Biconditional(left, right)
+
+
+# Largest nesting of operators in one compiled Python expression, far
+# below the parser's limit; deeper parts are computed into variables first
+MAX_NESTING = 50
+
+
+def postorder(sentence, known=()):
+    """
+    Returns the distinct subsentences of `sentence` that are not in
+    `known`, each after its children, using an explicit stack instead of
+    recursion.
+    """
+    order = []
+    seen = set()
+    stack = [(sentence, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if expanded:
+            order.append(node)
+        elif node not in seen and node not in known:
+            seen.add(node)
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node.children()))
+    return order
+
+
+def fold(sentence, step, results=None):
+    """
+    Returns step(node, parts) for `sentence`, where parts are the results
+    for node's children, computing each distinct subsentence's result
+    once, bottom-up. `results` maps sentences to results already known,
+    and gains the new ones.
+    """
+    results = dict() if results is None else results
+    for node in postorder(sentence, results):
+        results[node] = step(node, [results[child] for child in node.children()])
+    return results[sentence]
+
+
+def wrap(sentence, text, formula=True):
+    """
+    Returns Sentence.parenthesize(text) for the formula (or repr) `text`
+    of `sentence`, only scanning text when it is a symbol's name: any
+    other formula but a constant's And() or Or() is made of more than one
+    parenthesized part.
+    """
+    if formula:
+        while isinstance(sentence, (And, Or)) and len(sentence.children()) == 1:
+            sentence = sentence.children()[0]
+        if isinstance(sentence, (And, Or)) and not sentence.children():
+            return text  # a constant, written And() or Or()
+    if isinstance(sentence, Symbol) or not text:
+        return Sentence.parenthesize(text)
+    return f"({text})"
+
+
+def source(sentence, symbol, bitwise=False):
+    """
+    Returns Python statements and an expression that compute `sentence`,
+    where `symbol(name)` is the expression for a symbol's value.
+
+    Subsentences used more than once, and those nested too deeply for a
+    single expression, are computed into variables by the statements.
+    The expression works on booleans, or on masks if `bitwise`. A chain
+    of n masks joined by & or | nests n - 1 operations deep (unlike and
+    and or, which parse flat and must stay together to short-circuit), so
+    the operands of a wide bitwise And or Or are also combined MAX_NESTING
+    at a time into variables.
+    """
+    order = postorder(sentence)
+    uses = dict()
+    for node in order:
+        for child in node.children():
+            uses[child] = uses.get(child, 0) + 1
+    lines = []
+    expressions = dict()
+    depths = dict()
+
+    def assign(expression):
+        lines.append(f"t{len(lines)} = {expression}")
+        return f"t{len(lines) - 1}"
+
+    for node in order:
+        children = node.children()
+        if isinstance(node, Symbol):
+            expressions[node], depths[node] = symbol(node.name), 0
+            continue
+        express = node.bit_expression if bitwise else node.expression
+        parts = [expressions[child] for child in children]
+        depth = max((depths[child] for child in children), default=0)
+        if bitwise:
+            while len(parts) > MAX_NESTING:
+                parts = [assign(express(parts[i:i + MAX_NESTING]))
+                         for i in range(0, len(parts), MAX_NESTING)]
+                depth = 0
+            depth += max(1, len(parts) - 1)
+        else:
+            depth += 1
+        expression = express(parts)
+        if uses.get(node, 0) > 1 or depth > MAX_NESTING:
+            expression, depth = assign(expression), 0
+        expressions[node], depths[node] = expression, depth
+    return lines, expressions[sentence]
+
+
+# Tokens of formula text: operators, punctuation, words of symbol names,
+# and any other character, which is an error
+FORMULA_TOKEN = re.compile(r"<=>|=>|[¬∧∨(),]|[^\s¬∧∨(),<=]+|\S")
+FORMULA_WORD = re.compile(r"[^\s¬∧∨(),<=]+")
+
+# Infix operators of formula text by binding strength, weakest first
+INFIX = {"<=>": (0, Biconditional), "=>": (1, Implication), "∨": (2, Or), "∧": (3, And)}
+
+# Sentences written as repr writes them, as in Biconditional's formulas
+CALLS = {cls.__name__: cls for cls in [Not, And, Or, Implication, Biconditional]}
+
+
+def parse_formula(text):
+    """
+    Returns the sentence whose formula is `text`; the inverse of formula.
+
+    Chains of ∧ or ∨ give a single And or Or, => and <=> group to the
+    right, and ¬ binds tightest. Sentences may also be written as their
+    reprs, such as Not(A) or And(), the only way to write the constants.
+    Symbol names are words separated by single spaces, without
+    parentheses, commas or operators.
+
+    Parsing uses explicit stacks, so deeply nested text is fine. Raises
+    ValueError for text that is not a formula.
+    """
+    tokens = [(match.group(), match.start(), match.end())
+              for match in FORMULA_TOKEN.finditer(text)]
+    operands = []  # sentences, and [operator, operands] chains not yet closed
+    operators = []  # "¬", infix operators, "(" and (class, first operand) calls
+
+    def close(operand):
+        if isinstance(operand, list):
+            return INFIX[operand[0]][1](*operand[1])
+        return operand
+
+    def reduce():
+        operator = operators.pop()
+        right = close(operands.pop())
+        if operator == "¬":
+            operands.append(Not(right))
+            return
+        left = operands.pop()
+        if operator in ("∧", "∨"):
+            if isinstance(left, list) and left[0] == operator:
+                left[1].append(right)
+            else:
+                operands.append([operator, [close(left), right]])
+                return
+            operands.append(left)
+        else:
+            operands.append(INFIX[operator][1](close(left), right))
 
-def model_check(knowledge, query):
+    def binds(operator, strength):
+        """Checks if `operator` on the stack takes its right operand first."""
+        if operator == "¬":
+            return True
+        if operator in INFIX:
+            own = INFIX[operator][0]
+            return own > strength or (own == strength and operator in ("∧", "∨"))
+        return False
+
+    expect_operand = True
+    i = 0
+    while i < len(tokens):
+        token, start, end = tokens[i]
+        i += 1
+        if expect_operand:
+            if token == "¬":
+                operators.append(token)
+            elif token == "(":
+                operators.append(token)
+            elif (token in CALLS and i < len(tokens)
+                  and tokens[i][0] == "(" and tokens[i][1] == end):
+                operators.append((CALLS[token], len(operands)))
+                i += 1
+                if i < len(tokens) and tokens[i][0] == ")":  # no arguments
+                    i += 1
+                    operators.pop()
+                    operands.append(CALLS[token]())
+                    expect_operand = False
+            elif not FORMULA_WORD.fullmatch(token):
+                raise ValueError(f"expected a sentence at position {start}")
+            else:
+                words = [token]
+                while i < len(tokens) and FORMULA_WORD.fullmatch(tokens[i][0]):
+                    words.append(tokens[i][0])
+                    i += 1
+                operands.append(Symbol(" ".join(words)))
+                expect_operand = False
+        elif token in INFIX:
+            strength = INFIX[token][0]
+            while operators and binds(operators[-1], strength):
+                reduce()
+            operators.append(token)
+            expect_operand = True
+        elif token in "),":
+            while operators and (operators[-1] == "¬" or operators[-1] in INFIX):
+                reduce()
+            if not operators:
+                raise ValueError(f"unbalanced {token!r} at position {start}")
+            if token == "," and operators[-1] == "(":
+                raise ValueError(f"unexpected ',' at position {start}")
+            if token == ",":
+                operands[-1] = close(operands[-1])
+                expect_operand = True
+                continue
+            opener = operators.pop()
+            if opener == "(":
+                operands[-1] = close(operands[-1])
+            else:
+                cls, first = opener
+                arguments = [close(operand) for operand in operands[first:]]
+                del operands[first:]
+                try:
+                    operands.append(cls(*arguments))
+                except TypeError:
+                    raise ValueError(f"wrong arguments for {cls.__name__} "
+                                     f"ending at position {start}")
+        else:
+            raise ValueError(f"unexpected {token!r} at position {start}")
+    if expect_operand:
+        raise ValueError("expected a sentence at the end")
+    while operators:
+        if operators[-1] != "¬" and operators[-1] not in INFIX:
+            raise ValueError("unclosed parenthesis at the end")
+        reduce()
+    return close(operands[0])
+
+
+# The byte strings dumps starts with, then the classes of sentence nodes
+# by the code it writes for them
+SERIAL_MAGIC = b"SDAG\x01"
+SERIAL_KINDS = [Symbol, Not, And, Or, Implication, Biconditional]
+
+
+def encode_varints(numbers, out):
+    """Appends `numbers` to bytearray `out`, 7 bits per byte, lowest first."""
+    for number in numbers:
+        while number >= 0x80:
+            out.append(number & 0x7F | 0x80)
+            number >>= 7
+        out.append(number)
+
+
+def decode_varints(data, start=0, count=None):
+    """
+    Returns the numbers that encode_varints wrote to `data` from `start`,
+    all of them or the first `count`, and the position after them.
+    """
+    numbers = []
+    number = shift = 0
+    position = start
+    end = len(data)
+    while position < end and (count is None or len(numbers) < count):
+        byte = data[position]
+        position += 1
+        number |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            numbers.append(number)
+            number = shift = 0
+    if shift or (count is not None and len(numbers) < count):
+        raise ValueError("truncated data")
+    return numbers, position
+
+
+def dumps(sentence):
+    """
+    Returns `sentence` as compact bytes, from which loads rebuilds it.
+
+    Each distinct subsentence is written once, after its children, as a
+    kind code then either a symbol's number or its children's distances
+    back (preceded by their count for And and Or); symbols' names are
+    written once at the start. All numbers are varints, so most take a
+    single byte.
+    """
+    kinds = {cls: code for code, cls in enumerate(SERIAL_KINDS)}
+    names = dict()  # symbol name -> number
+    index = dict()  # node -> position
+    body = []
+    for position, node in enumerate(postorder(sentence)):
+        body.append(kinds[type(node)])
+        if isinstance(node, Symbol):
+            body.append(names.setdefault(node.name, len(names)))
+        else:
+            children = node.children()
+            if node.variadic:
+                body.append(len(children))
+            body.extend(position - index[child] for child in children)
+        index[node] = position
+    out = bytearray(SERIAL_MAGIC)
+    encode_varints([len(names)], out)
+    for name in names:
+        encoded = name.encode()
+        encode_varints([len(encoded)], out)
+        out += encoded
+    encode_varints([len(index)], out)
+    encode_varints(body, out)
+    return bytes(out)
+
+
+def loads(data):
+    """Returns the sentence that dumps wrote to `data`."""
+    if not data.startswith(SERIAL_MAGIC):
+        raise ValueError("not a serialized sentence")
+    (count,), position = decode_varints(data, len(SERIAL_MAGIC), 1)
+    names = []
+    for _ in range(count):
+        (length,), position = decode_varints(data, position, 1)
+        names.append(data[position:position + length].decode())
+        position += length
+    (count,), position = decode_varints(data, position, 1)
+    body, _ = decode_varints(data, position)
+    nodes = []
+    at = 0
+    try:
+        for _ in range(count):
+            cls = SERIAL_KINDS[body[at]]
+            if cls is Symbol:
+                nodes.append(Symbol(names[body[at + 1]]))
+                at += 2
+                continue
+            arity = body[at + 1] if cls.variadic else len(cls.__slots__)
+            at += 2 if cls.variadic else 1
+            here = len(nodes)
+            nodes.append(cls(*[nodes[here - distance] for distance in body[at:at + arity]]))
+            at += arity
+    except (IndexError, TypeError):
+        raise ValueError("corrupt serialized sentence")
+    if not nodes or at != len(body):
+        raise ValueError("corrupt serialized sentence")
+    return nodes[-1]
+
+
+def dump(sentence, file):
+    """Writes `sentence` to binary `file`; see dumps."""
+    file.write(dumps(sentence))
+
+
+def load(file):
+    """Reads a sentence that dump wrote to binary `file`."""
+    return loads(file.read())
+
+
+def define(arguments, lines, result):
+    """Returns a function of `arguments` running `lines`, returning `result`."""
+    body = "".join(f"    {line}\n" for line in lines)
+    namespace = dict()
+    exec(f"def compiled({arguments}):\n{body}    return {result}\n", namespace)
+    return namespace["compiled"]
+
+
+# The constants: an empty conjunction is true, an empty disjunction false
+TRUE = And()
+FALSE = Or()
+
+
+def complemented(sentence, sentences):
+    """Checks if `sentences` (a dict or set) holds the negation of `sentence`."""
+    if isinstance(sentence, Not) and sentence.operand in sentences:
+        return True
+    return Sentence.interned.get((Not, sentence)) in sentences
+
+
+def simplify(sentence, cache=None):
+    """
+    Returns a sentence equivalent to `sentence` and usually smaller.
+
+    Nested conjunctions and disjunctions are flattened, repeated and
+    absorbed operands dropped, double negations removed, and the
+    constants TRUE and FALSE folded away. `cache` maps sentences to their
+    simplified forms, so shared subsentences are simplified once.
+    """
+    cache = dict() if cache is None else cache
+    return fold(sentence, lambda node, parts: node.simplified(parts, cache), cache)
+
+
+def compile_sentence(sentence, symbols):
+    """
+    Compiles a logical sentence into a function of a tuple of booleans,
+    one per name in `symbols`, that returns the sentence's truth value.
+
+    The sentence becomes straight-line Python code, so evaluating it
+    costs no method calls or dict lookups per node.
+    """
+    index = {name: i for i, name in enumerate(symbols)}
+    lines, result = source(sentence, lambda name: f"m[{index[name]}]")
+    return define("m", lines, result)
+
+
+def compile_bits(sentence):
+    """
+    Compiles a logical sentence into a function of masks and full that
+    computes sentence.bits(masks, full).
+    """
+    lines, result = source(sentence, lambda name: f"masks[{name!r}]", bitwise=True)
+    return define("masks, full", lines, result)
+
+
+def model_check_enumerate(knowledge, query):
     """Checks if knowledge base entails query."""
 
     def check_all(knowledge, query, symbols, model):
@@ -257,7 +1043,1090 @@ def model_check(knowledge, query):
                     check_all(knowledge, query, remaining, model_false))
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = set(knowledge.symbols() | query.symbols())
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+def model_check_compiled(knowledge, query):
+    """
+    Checks if knowledge base entails query, evaluating compiled sentences
+    in every model.
+    """
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    knowledge = compile_sentence(knowledge, symbols)
+    query = compile_sentence(query, symbols)
+    return all(query(model)
+               for model in itertools.product((True, False), repeat=len(symbols))
+               if knowledge(model))
+
+
+def int_masks(count):
+    """
+    Returns the masks of `count` symbols over all 2^count models, as
+    Python integers, and the mask with every model's bit set.
+
+    Model j assigns symbol i the value of bit i of j.
+    """
+    size = 1 << count
+    full = (1 << size) - 1
+    masks = []
+    for i in range(count):
+        mask = ((1 << (1 << i)) - 1) << (1 << i)  # 2^i zeros then 2^i ones
+        width = 2 << i
+        while width < size:  # repeat by doubling; dividing big ints is slow
+            mask |= mask << width
+            width *= 2
+        masks.append(mask)
+    return masks, full
+
+
+def numpy_masks(count):
+    """
+    Returns the masks of `count` symbols (at least 6) over all 2^count
+    models, as arrays of 64-bit words, and the mask of every model.
+    """
+    words = np.arange(1 << (count - 6), dtype=np.uint64)
+    patterns = [0xAAAAAAAAAAAAAAAA, 0xCCCCCCCCCCCCCCCC, 0xF0F0F0F0F0F0F0F0,
+                0xFF00FF00FF00FF00, 0xFFFF0000FFFF0000, 0xFFFFFFFF00000000]
+    full = np.uint64(0xFFFFFFFFFFFFFFFF)
+    masks = [np.full(len(words), pattern, dtype=np.uint64) for pattern in patterns]
+    for i in range(6, count):
+        masks.append(np.where((words >> np.uint64(i - 6)) & np.uint64(1), full, np.uint64(0)))
+    return masks, full
+
+
+def chunk_size(count):
+    """Returns how many of `count` symbols vary within a chunk of models."""
+    if np is None or count <= max(INT_CHUNK_SYMBOLS, 6):
+        return min(count, INT_CHUNK_SYMBOLS)
+    return min(count, NUMPY_CHUNK_SYMBOLS)
+
+
+def chunks(symbols, fixed=None):
+    """
+    Yields the symbol masks and the mask of every model for each chunk of
+    the models that assign `symbols` every combination of values and the
+    names in `fixed` their values there.
+
+    The first chunk_size(len(symbols)) symbols vary within a chunk, one
+    model per bit; the rest are fixed per chunk, so each is all true or
+    all false. The same dict of masks is yielded each time.
+    """
+    low = chunk_size(len(symbols))
+    masks, full = int_masks(low) if low < 6 or low <= INT_CHUNK_SYMBOLS else numpy_masks(low)
+    masks = dict(zip(symbols, masks))
+    for name, value in (fixed or {}).items():
+        masks[name] = full if value else 0
+    for values in itertools.product((full, 0), repeat=len(symbols) - low):
+        masks.update(zip(symbols[low:], values))
+        yield masks, full
+
+
+def popcount(mask, low):
+    """Returns how many of the 2^low models of a chunk are set in `mask`."""
+    if isinstance(mask, int):
+        return mask.bit_count()
+    if np.ndim(mask) == 0:  # the same word throughout the chunk
+        return bin(int(mask)).count("1") << (low - 6)
+    return int(np.unpackbits(mask.astype("<u8").view(np.uint8)).sum())
+
+
+def set_bits(mask, low):
+    """Yields the indexes of the models of a chunk set in `mask`, in order."""
+    if isinstance(mask, int):
+        while mask:
+            bit = mask & -mask
+            yield bit.bit_length() - 1
+            mask ^= bit
+    elif np.ndim(mask) == 0:
+        word = int(mask)
+        bits = [i for i in range(64) if word >> i & 1]
+        for start in range(0, 1 << low, 64):
+            for i in bits:
+                yield start + i
+    else:
+        flags = np.unpackbits(mask.astype("<u8").view(np.uint8), bitorder="little")
+        yield from (int(i) for i in np.flatnonzero(flags))
+
+
+def has_counter_model(knowledge, query, symbols, fixed=None, stop=None):
+    """
+    Checks if a model of knowledge falsifies query, evaluating both in a
+    whole chunk of models at once with bitwise operations.
+
+    The models assign `symbols` every combination of values and the names
+    in `fixed` their values there; see chunks. Returns None, without
+    finishing, once `stop` is set.
+    """
+    counter_models = compile_bits(And(knowledge, Not(query)))
+    for masks, full in chunks(symbols, fixed):
+        if stop is not None and stop.is_set():
+            return None
+        counter = counter_models(masks, full)
+        if counter.any() if hasattr(counter, "any") else counter:
+            return True
+    return False
+
+
+def model_check_bitwise(knowledge, query):
+    """
+    Checks if knowledge base entails query, evaluating both in a whole
+    chunk of models at once with bitwise operations.
+    """
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    return not has_counter_model(knowledge, query, symbols)
+
+
+class CNF():
+    """
+    A Tseitin encoding of sentences in conjunctive normal form.
+
+    Variables are positive integers, literals are variables or their
+    negations, and clauses are lists of literals, as in DIMACS. Every
+    subsentence gets a variable equivalent to it, so the encoding grows
+    linearly with the sentences, and equal subsentences share a variable.
+    """
+
+    def __init__(self):
+        self.variables = dict()  # symbol name -> variable
+        self.clauses = []
+        self.count = 0  # variables so far
+        self.cache = dict()  # sentence -> literal
+
+    def new_variable(self):
+        self.count += 1
+        return self.count
+
+    def variable(self, name):
+        """Returns the variable for symbol `name`."""
+        if name not in self.variables:
+            self.variables[name] = self.new_variable()
+        return self.variables[name]
+
+    def literal(self, sentence):
+        """Returns a literal equivalent to `sentence`."""
+        return fold(sentence, lambda node, literals: node.encode(self, literals), self.cache)
+
+    def define_and(self, literals):
+        """Returns a new variable equivalent to the conjunction of `literals`."""
+        x = self.new_variable()
+        for literal in literals:
+            self.clauses.append([-x, literal])
+        self.clauses.append([x] + [-literal for literal in literals])
+        return x
+
+    def define_equal(self, a, b):
+        """Returns a new variable that is true when `a` and `b` are equal."""
+        x = self.new_variable()
+        self.clauses.extend([[-x, -a, b], [-x, a, -b], [x, a, b], [x, -a, -b]])
+        return x
+
+    def add(self, sentence):
+        """Asserts `sentence`."""
+        self.clauses.append([self.literal(sentence)])
+
+
+class Solver():
+    """
+    A CDCL SAT solver: unit propagation with two watched literals per
+    clause, first-UIP clause learning, activity-based branching with
+    saved phases, and restarts.
+
+    Clauses may be added between calls to solve, and learned clauses are
+    kept, so a solver answers a series of related questions quickly.
+    """
+
+    def __init__(self, clauses=()):
+        self.ok = True  # False once the clauses are unsatisfiable
+        self.count = 0  # variables so far
+        self.value = dict()  # literal -> truth value, for assigned literals
+        self.level = [0]  # variable -> decision level
+        self.reason = [None]  # variable -> clause that implied it
+        self.activity = [0.0]
+        self.phase = [False]  # variable -> last value, tried first
+        self.watches = dict()  # literal -> clauses watching it
+        self.trail = []  # assigned literals, in order
+        self.limits = []  # trail length at the start of each decision level
+        self.head = 0  # trail index of the next literal to propagate
+        self.order = []  # heap of (-activity, variable)
+        self.increment = 1.0
+        self.conflicts = 0
+        self.model = None  # variable -> value, after a satisfiable solve
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def grow(self, count):
+        """Makes room for variables up to `count`."""
+        while self.count < count:
+            self.count += 1
+            self.level.append(0)
+            self.reason.append(None)
+            self.activity.append(0.0)
+            self.phase.append(False)
+            self.watches[self.count] = []
+            self.watches[-self.count] = []
+            heapq.heappush(self.order, (0.0, self.count))
+
+    def add_clause(self, clause):
+        """Adds a clause; returns False if the clauses became unsatisfiable."""
+        self.cancel(0)
+        if not self.ok:
+            return False
+        self.grow(max((abs(literal) for literal in clause), default=0))
+        literals = []
+        for literal in clause:
+            value = self.value.get(literal)
+            if value or -literal in literals:
+                return True  # satisfied or a tautology
+            if value is None and literal not in literals:
+                literals.append(literal)
+        if not literals:
+            self.ok = False
+        elif len(literals) == 1:
+            self.assign(literals[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.watches[literals[0]].append(literals)
+            self.watches[literals[1]].append(literals)
+        return self.ok
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.value[literal] = True
+        self.value[-literal] = False
+        self.level[variable] = len(self.limits)
+        self.reason[variable] = reason
+        self.trail.append(literal)
+
+    def cancel(self, level):
+        """Undoes the assignments above decision level `level`."""
+        if len(self.limits) <= level:
+            return
+        limit = self.limits[level]
+        for literal in self.trail[limit:]:
+            variable = abs(literal)
+            del self.value[literal], self.value[-literal]
+            self.phase[variable] = literal > 0
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+        del self.trail[limit:], self.limits[level:]
+        self.head = limit
+
+    def propagate(self):
+        """Assigns implied literals; returns a conflicting clause, if any."""
+        value = self.value
+        watches = self.watches
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            watching = watches[false]
+            watches[false] = kept = []
+            for i, clause in enumerate(watching):
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                first = clause[0]
+                if value.get(first):
+                    kept.append(clause)
+                    continue
+                for k in range(2, len(clause)):
+                    if value.get(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], false
+                        watches[clause[1]].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if value.get(first) is False:
+                        kept.extend(watching[i + 1:])
+                        return clause
+                    self.assign(first, clause)
+        return None
+
+    def bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+            self.order = [(-self.activity[v], v) for v in range(1, self.count + 1)]
+            heapq.heapify(self.order)
+        else:
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+
+    def analyze(self, conflict):
+        """
+        Returns a learned clause, asserting at the first unique implication
+        point, and the level to backjump to.
+        """
+        level = len(self.limits)
+        seen = set()
+        learned = [None]
+        pending = 0  # seen literals of the current level not yet resolved
+        literal = None
+        index = len(self.trail) - 1
+        clause = conflict
+        while True:
+            for other in clause:
+                variable = abs(other)
+                if other == literal or variable in seen or not self.level[variable]:
+                    continue
+                seen.add(variable)
+                self.bump(variable)
+                if self.level[variable] == level:
+                    pending += 1
+                else:
+                    learned.append(other)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if not pending:
+                break
+            clause = self.reason[abs(literal)]
+        learned[0] = -literal
+        self.increment /= 0.95
+        if len(learned) == 1:
+            return learned, 0
+        # Watch the literal that becomes unassigned last
+        deepest = max(range(1, len(learned)), key=lambda i: self.level[abs(learned[i])])
+        learned[1], learned[deepest] = learned[deepest], learned[1]
+        return learned, self.level[abs(learned[1])]
+
+    def decide(self):
+        """Returns an unassigned variable of greatest activity, or None."""
+        while self.order:
+            _, variable = heapq.heappop(self.order)
+            if variable not in self.value:
+                return variable
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Returns whether the clauses and `assumptions`, a list of literals,
+        are satisfiable. If so, self.model holds a satisfying assignment.
+        """
+        self.model = None
+        self.cancel(0)
+        if not self.ok:
+            return False
+        self.grow(max((abs(literal) for literal in assumptions), default=0))
+        restart = 100
+        conflicts = 0
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                conflicts += 1
+                if not self.limits:
+                    self.ok = False
+                    return False
+                learned, level = self.analyze(conflict)
+                self.cancel(level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.watches[learned[0]].append(learned)
+                    self.watches[learned[1]].append(learned)
+                    self.assign(learned[0], learned)
+                continue
+            if conflicts >= restart:
+                conflicts = 0
+                restart = int(restart * 1.5)
+                self.cancel(0)
+                continue
+            level = len(self.limits)
+            if level < len(assumptions):
+                literal = assumptions[level]
+                if self.value.get(literal) is False:
+                    self.cancel(0)
+                    return False
+                self.limits.append(len(self.trail))
+                if literal not in self.value:
+                    self.assign(literal, None)
+                continue
+            variable = self.decide()
+            if variable is None:
+                self.model = {v: self.value[v] for v in range(1, self.count + 1)}
+                self.cancel(0)
+                return True
+            self.limits.append(len(self.trail))
+            self.assign(variable if self.phase[variable] else -variable, None)
+
+
+class KnowledgeBase():
+    """
+    Sentences known to be true, encoded once for a SAT solver that keeps
+    its learned clauses from one query to the next.
+
+    Queries are answered against everything added so far. A counter-model
+    found for one query also answers later queries it falsifies, until
+    more knowledge is added.
+    """
+
+    def __init__(self, *sentences):
+        self.cnf = CNF()
+        self.solver = Solver()
+        self.fed = 0  # clauses of self.cnf given to the solver so far
+        self.models = []  # symbol name -> value, models of the knowledge
+        self.entailed = set()  # queries known to follow, which stay true
+        for sentence in sentences:
+            self.add(sentence)
+
+    def feed(self):
+        """Gives the solver the clauses encoded since the last call."""
+        for clause in self.cnf.clauses[self.fed:]:
+            self.solver.add_clause(clause)
+        self.fed = len(self.cnf.clauses)
+
+    def add(self, sentence):
+        """Adds `sentence` to the knowledge."""
+        self.cnf.add(simplify(sentence))
+        self.feed()
+        self.models.clear()
+
+    def entails(self, query):
+        """Checks if the knowledge entails `query`."""
+        if query in self.entailed:
+            return True
+        symbols = query.symbols()
+        for model in self.models:
+            if symbols <= model.keys() and not query.evaluate(model):
+                return False
+        literal = self.cnf.literal(simplify(query))
+        self.feed()
+        if self.solver.solve([-literal]):
+            model = self.solver.model
+            self.models.append({name: model[variable]
+                                for name, variable in self.cnf.variables.items()})
+            return False
+        self.entailed.add(query)
+        return True
+
+
+def model_check_sat(knowledge, query):
+    """
+    Checks if knowledge base entails query by showing that knowledge and
+    not query is unsatisfiable, without enumerating models.
+    """
+    return KnowledgeBase(knowledge).entails(query)
+
+
+def conjuncts(sentence):
+    """Returns the conjuncts of a sentence, looking inside nested Ands."""
+    if not isinstance(sentence, And):
+        return [sentence]
+    return [c for conjunct in sentence.conjuncts for c in conjuncts(conjunct)]
+
+
+def unit_propagate(parts, model, forced):
+    """
+    Assigns in `model` the symbols forced by conjuncts `parts` that have
+    one unassigned symbol and are false for one of its values, appending
+    them to `forced`. Returns False if some conjunct is false.
+    """
+    changed = True
+    while changed:
+        changed = False
+        for part in parts:
+            value = part.partial(model)
+            if value is False:
+                return False
+            if value is not None:
+                continue
+            free = [name for name in part.symbols() if name not in model]
+            if len(free) != 1:
+                continue
+            name = free[0]
+            model[name] = True
+            if_true = part.partial(model)
+            model[name] = False
+            if part.partial(model) is not False:
+                if if_true is not False:
+                    del model[name]
+                    continue
+            elif if_true is False:
+                del model[name]
+                return False
+            else:
+                model[name] = True
+            forced.append(name)
+            changed = True
+    return True
+
+
+def branching_order(parts, symbols):
+    """Returns `symbols`, those the most conjuncts `parts` mention first."""
+    uses = dict()
+    for part in parts:
+        for name in part.symbols():
+            uses[name] = uses.get(name, 0) + 1
+    return sorted(symbols, key=lambda name: (-uses.get(name, 0), name))
+
+
+def model_check_pruned(knowledge, query):
+    """
+    Checks if knowledge base entails query, enumerating partial models
+    and skipping every completion of one that already decides the check.
+
+    A partial model is done if knowledge is false or query is true in it,
+    and refutes entailment if knowledge is true and query false in it.
+    A conjunct of knowledge with one unassigned symbol, false for one
+    value of that symbol, forces the other value (unit propagation).
+    """
+    parts = conjuncts(knowledge)
+    symbols = branching_order(parts, knowledge.symbols() | query.symbols())
+    model = dict()
+
+    def check_all(index):
+        """Checks entailment in the completions of the current model."""
+        forced = []
+        try:
+            if not unit_propagate(parts, model, forced):
+                return True
+            if query.partial(model) is True:
+                return True
+            known = knowledge.partial(model)
+            if known is False:
+                return True
+            if known is True and query.partial(model) is False:
+                return False
+            while symbols[index] in model:
+                index += 1
+            p = symbols[index]
+            for value in (True, False):
+                model[p] = value
+                entailed = check_all(index + 1)
+                del model[p]
+                if not entailed:
+                    return False
+            return True
+        finally:
+            for name in forced:
+                del model[name]
+
+    return check_all(0)
+
+
+def partial_models(knowledge, symbols):
+    """
+    Yields partial models, assigning some of `symbols`, in which knowledge
+    is true whatever the unassigned symbols are. Every model of knowledge
+    over `symbols` completes exactly one of them.
+
+    The same dict is yielded each time, changed in between, so the search
+    holds only one model however many there are. Branches are kept on an
+    explicit stack, so any number of symbols can be branched on.
+    """
+    parts = conjuncts(knowledge)
+    symbols = branching_order(parts, symbols)
+    model = dict()
+    branches = []  # (symbol, index of the next symbol, symbols forced before it)
+    index = 0
+    while True:
+        forced = []
+        known = knowledge.partial(model) if unit_propagate(parts, model, forced) else False
+        if known is None:
+            while symbols[index] in model:
+                index += 1
+            branches.append((symbols[index], index + 1, forced))
+            model[symbols[index]] = True
+            index += 1
+            continue
+        if known is True:
+            yield model
+        for name in forced:
+            del model[name]
+        while branches:
+            p, index, forced = branches[-1]
+            if model[p]:
+                model[p] = False
+                break
+            del model[p]
+            for name in forced:
+                del model[name]
+            branches.pop()
+        else:
+            return
+
+
+def count_clause_models(clauses, variables, cache):
+    """
+    Returns how many assignments to `variables` satisfy `clauses`, sets
+    of literals over those variables (#SAT by DPLL).
+
+    Unit clauses are propagated, independent groups of clauses (that
+    share no variables) are counted separately and multiplied, and each
+    group's count is cached, since it recurs under different branches.
+    """
+    while True:
+        unit = next((clause for clause in clauses if len(clause) == 1), None)
+        if unit is None:
+            break
+        (literal,) = unit
+        clauses = condition(clauses, literal)
+        if clauses is None:
+            return 0
+        variables = variables - {abs(literal)}
+    mentioned = {abs(literal) for clause in clauses for literal in clause}
+    result = 1 << len(variables - mentioned)
+    for component in components(clauses):
+        key = frozenset(component)
+        if key not in cache:
+            uses = dict()
+            for clause in component:
+                for literal in clause:
+                    uses[abs(literal)] = uses.get(abs(literal), 0) + 1
+            variable = max(uses, key=uses.get)
+            count = 0
+            for literal in (variable, -variable):
+                branch = condition(component, literal)
+                if branch is not None:
+                    count += count_clause_models(branch, uses.keys() - {variable}, cache)
+            cache[key] = count
+        result *= cache[key]
+        if not result:
+            break
+    return result
+
+
+def condition(clauses, literal):
+    """
+    Returns the clauses with `literal` true, or None if one became empty.
+    """
+    result = []
+    for clause in clauses:
+        if literal in clause:
+            continue
+        if -literal in clause:
+            clause = clause - {-literal}
+            if not clause:
+                return None
+        result.append(clause)
+    return result
+
+
+def components(clauses):
+    """Returns groups of the clauses such that no two groups share a variable."""
+    parent = dict()
+
+    def find(variable):
+        while parent.setdefault(variable, variable) != variable:
+            parent[variable] = parent[parent[variable]]
+            variable = parent[variable]
+        return variable
+
+    for clause in clauses:
+        first = find(abs(next(iter(clause))))
+        for literal in clause:
+            parent[find(abs(literal))] = first
+    groups = dict()
+    for clause in clauses:
+        groups.setdefault(find(abs(next(iter(clause)))), []).append(clause)
+    return list(groups.values())
+
+
+def model_symbols(knowledge, symbols):
+    """Returns the sorted names of knowledge's symbols and `symbols`."""
+    names = {symbol.name if isinstance(symbol, Symbol) else symbol
+             for symbol in symbols or ()}
+    return sorted(knowledge.symbols() | names)
+
+
+def count_models(knowledge, symbols=None):
+    """
+    Returns how many models, assigning knowledge's symbols and any extra
+    `symbols` (names or Symbols), satisfy knowledge.
+
+    Up to one chunk of symbols, every model is checked bit-parallel;
+    beyond, models are counted on knowledge's CNF encoding by #SAT.
+    """
+    symbols = model_symbols(knowledge, symbols)
+    knowledge = simplify(knowledge)
+    if len(symbols) <= chunk_size(len(symbols)):
+        low = len(symbols)
+        models = compile_bits(knowledge)
+        return sum(popcount(models(masks, full), low)
+                   for masks, full in chunks(symbols))
+    cnf = CNF()
+    cnf.add(knowledge)
+    clauses = [frozenset(clause) for clause in cnf.clauses]
+    count = count_clause_models(clauses, set(range(1, cnf.count + 1)), dict())
+    return count << (len(symbols) - len(knowledge.symbols()))
+
+
+def iter_models(knowledge, symbols=None):
+    """
+    Yields the models, assigning knowledge's symbols and any extra
+    `symbols` (names or Symbols), that satisfy knowledge, as dicts from
+    symbol name to value, one at a time.
+
+    Up to one chunk of symbols, every model is checked bit-parallel;
+    beyond, partial models found by pruned search are completed.
+    """
+    symbols = model_symbols(knowledge, symbols)
+    knowledge = simplify(knowledge)
+    low = chunk_size(len(symbols))
+    if len(symbols) <= low:
+        models = compile_bits(knowledge)
+        for masks, full in chunks(symbols):
+            for index in set_bits(models(masks, full), low):
+                yield {name: bool(index >> i & 1) for i, name in enumerate(symbols)}
+        return
+    for model in partial_models(knowledge, symbols):
+        free = [name for name in symbols if name not in model]
+        for values in itertools.product((True, False), repeat=len(free)):
+            yield {**model, **dict(zip(free, values))}
+
+
+class BDD():
+    """
+    Reduced ordered binary decision diagrams, all sharing one unique
+    table of nodes and one cache of operation results.
+
+    A node is an integer: 0 and 1 are the constants, and any other node
+    tests the variable at its level, leading to its low node if that is
+    false and its high node if true. The unique table keeps one node per
+    (level, low, high), so equal functions are the same node, and every
+    node's children were created, and numbered, before it.
+
+    Nodes are never freed: past `max_nodes` nodes, MemoryError is
+    raised. The operation cache is cleared whenever it outgrows
+    `cache_size` entries. Operations recurse once per level, so
+    diagrams are limited to a few hundred variables.
+    """
+
+    def __init__(self, order=(), max_nodes=None, cache_size=1 << 20):
+        self.order = []  # level -> symbol name
+        self.levels = dict()  # symbol name -> level
+        self.level = [BDD_TERMINAL, BDD_TERMINAL]  # node -> level
+        self.low = [0, 1]
+        self.high = [0, 1]
+        self.unique = dict()  # (level, low, high) -> node
+        self.cache = dict()  # (operation, node, node) -> node
+        self.diagrams = dict()  # sentence -> node
+        self.max_nodes = max_nodes
+        self.cache_size = cache_size
+        for name in order:
+            self.add_variable(name)
+
+    def __len__(self):
+        return len(self.level)
+
+    def add_variable(self, name):
+        """Returns the level of symbol `name`, placing it last if new."""
+        if name not in self.levels:
+            self.levels[name] = len(self.order)
+            self.order.append(name)
+        return self.levels[name]
+
+    def make(self, level, low, high):
+        """Returns the node testing `level`, reduced and unique."""
+        if low == high:
+            return low
+        key = (level, low, high)
+        node = self.unique.get(key)
+        if node is None:
+            if self.max_nodes is not None and len(self.level) >= self.max_nodes:
+                raise MemoryError(f"BDD exceeds {self.max_nodes} nodes")
+            node = self.unique[key] = len(self.level)
+            self.level.append(level)
+            self.low.append(low)
+            self.high.append(high)
+        return node
+
+    def variable(self, name):
+        """Returns the node of symbol `name`."""
+        return self.make(self.add_variable(name), 0, 1)
+
+    def remember(self, key, node):
+        if len(self.cache) >= self.cache_size:
+            self.cache.clear()
+        self.cache[key] = node
+        return node
+
+    def negate(self, u):
+        """Returns the node of not u."""
+        if u < 2:
+            return 1 - u
+        key = ("not", u, u)
+        if key in self.cache:
+            return self.cache[key]
+        return self.remember(key, self.make(self.level[u], self.negate(self.low[u]),
+                                            self.negate(self.high[u])))
+
+    def apply(self, operation, u, v):
+        """Returns the node of u and v, u or v, or u xor v, by `operation`."""
+        if u > v:  # every operation commutes
+            u, v = v, u
+        if u == 0:
+            return 0 if operation == "and" else v
+        if u == 1:
+            return v if operation == "and" else 1 if operation == "or" else self.negate(v)
+        if u == v:
+            return 0 if operation == "xor" else u
+        key = (operation, u, v)
+        if key in self.cache:
+            return self.cache[key]
+        level = min(self.level[u], self.level[v])
+        u0, u1 = (self.low[u], self.high[u]) if self.level[u] == level else (u, u)
+        v0, v1 = (self.low[v], self.high[v]) if self.level[v] == level else (v, v)
+        return self.remember(key, self.make(level, self.apply(operation, u0, v0),
+                                            self.apply(operation, u1, v1)))
+
+    def combine(self, operation, nodes, sentences):
+        """
+        Returns the node of `operation` over all `nodes`, those of
+        `sentences`. They are combined in order of their last variable,
+        so that each variable is settled early and intermediate diagrams
+        stay small.
+        """
+        def last(pair):
+            return max([self.levels[name] for name in pair[1].symbols()], default=-1)
+
+        result = 1 if operation == "and" else 0
+        for node, _ in sorted(zip(nodes, sentences), key=last):
+            result = self.apply(operation, result, node)
+        return result
+
+    def diagram(self, sentence):
+        """Returns the node of `sentence`."""
+        return fold(sentence, lambda node, parts: node.diagram(self, parts), self.diagrams)
+
+    def reachable(self, u):
+        """Returns the nodes reachable from `u`, in increasing order."""
+        seen = {u}
+        stack = [u]
+        while stack:
+            node = stack.pop()
+            if node > 1:
+                for child in (self.low[node], self.high[node]):
+                    if child not in seen:
+                        seen.add(child)
+                        stack.append(child)
+        return sorted(seen)
+
+    def size(self, u):
+        """Returns how many nodes, constants included, `u` is made of."""
+        return len(self.reachable(u))
+
+    def count(self, u):
+        """Returns how many assignments to all the variables satisfy `u`."""
+        n = len(self.order)
+
+        def level(node):
+            return n if node < 2 else self.level[node]
+
+        counts = {0: 0, 1: 1}  # node -> models over the variables from its level on
+        for node in self.reachable(u):
+            if node > 1:
+                low, high = self.low[node], self.high[node]
+                counts[node] = ((counts[low] << (level(low) - level(node) - 1))
+                                + (counts[high] << (level(high) - level(node) - 1)))
+        return counts[u] << level(u)
+
+
+# The level of the constant nodes, below every variable
+BDD_TERMINAL = float("inf")
+
+
+def appearance_order(sentence):
+    """Returns the symbols' names in the order a walk over `sentence` meets them."""
+    return [node.name for node in postorder(sentence) if isinstance(node, Symbol)]
+
+
+def frequency_order(sentence):
+    """Returns the symbols' names, those in the most subsentences first."""
+    uses = dict.fromkeys(appearance_order(sentence), 0)
+    for node in postorder(sentence):
+        for child in node.children():
+            if isinstance(child, Symbol):
+                uses[child.name] += 1
+    return sorted(uses, key=lambda name: -uses[name])
+
+
+def force_order(sentence, rounds=20):
+    """
+    Returns the symbols' names ordered by the FORCE heuristic: each round
+    moves every symbol to the mean center of the conjuncts it appears in,
+    so symbols constrained together end up close together.
+    """
+    order = appearance_order(sentence)
+    groups = [part.symbols() for part in conjuncts(sentence)]
+    for _ in range(rounds):
+        position = {name: i for i, name in enumerate(order)}
+        centers = [sum(position[name] for name in group) / len(group)
+                   for group in groups if group]
+        pulls = {name: [] for name in order}
+        for group, center in zip([group for group in groups if group], centers):
+            for name in group:
+                pulls[name].append(center)
+        moved = sorted(order, key=lambda name: (sum(pulls[name]) / len(pulls[name])
+                                                if pulls[name] else position[name]))
+        if moved == order:
+            break
+        order = moved
+    return order
+
+
+# Variable orderings for BDDs by name; the size of a diagram, and so the
+# cost of building and querying it, depends heavily on the ordering
+ORDERINGS = {
+    "appearance": appearance_order,
+    "frequency": frequency_order,
+    "force": force_order,
+}
+
+
+class DecisionDiagram():
+    """
+    A knowledge base compiled once into a BDD, so that entailment of a
+    query, equivalence to a sentence and the number of models take time
+    polynomial in the size of the diagrams rather than of the truth table.
+
+    The variables are ordered by the named heuristic of ORDERINGS; see
+    BDD for `max_nodes`.
+    """
+
+    def __init__(self, knowledge, ordering="force", max_nodes=None):
+        try:
+            order = ORDERINGS[ordering]
+        except KeyError:
+            raise ValueError(f"unknown ordering {ordering!r}")
+        self.knowledge = knowledge
+        simplified = simplify(knowledge)
+        self.bdd = BDD(order(simplified), max_nodes)
+        self.root = self.bdd.diagram(simplified)
+
+    def entails(self, query):
+        """Checks if the knowledge entails `query`."""
+        query = self.bdd.diagram(simplify(query))
+        return self.bdd.apply("and", self.root, self.bdd.negate(query)) == 0
+
+    def equivalent(self, sentence):
+        """Checks if the knowledge is equivalent to `sentence`."""
+        return self.bdd.diagram(simplify(sentence)) == self.root
+
+    def count(self, symbols=None):
+        """
+        Returns how many models, assigning knowledge's symbols and any
+        extra `symbols` (names or Symbols), satisfy the knowledge.
+        """
+        names = set(model_symbols(self.knowledge, symbols))
+        for name in names:
+            self.bdd.add_variable(name)
+        return self.bdd.count(self.root) >> (len(self.bdd.order) - len(names))
+
+
+def model_check_bdd(knowledge, query):
+    """
+    Checks if knowledge base entails query by compiling both into a
+    binary decision diagram.
+    """
+    return DecisionDiagram(knowledge).entails(query)
+
+
+_worker_stop = None  # set by any worker that finds a counter-model
+
+
+def _init_worker(stop):
+    global _worker_stop
+    _worker_stop = stop
+
+
+def _check_partition(knowledge, query, symbols, prefix):
+    """
+    Checks the models in which the first symbols take the values in
+    `prefix`, in a worker process, for one that satisfies knowledge but
+    not query. Stops early, returning None, once another worker finds one.
+    """
+    fixed = dict(zip(symbols, prefix))
+    found = has_counter_model(knowledge, query, symbols[len(prefix):], fixed,
+                              _worker_stop)
+    if found:
+        _worker_stop.set()
+    return found
+
+
+def model_check_parallel(knowledge, query, workers=None):
+    """
+    Checks if knowledge base entails query, checking partitions of the
+    models across a pool of `workers` processes.
+
+    Each partition fixes the values of the first few symbols. The check
+    ends as soon as any partition has a model of knowledge but not query.
+    """
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    if len(symbols) < PARALLEL_MIN_SYMBOLS:
+        return not has_counter_model(knowledge, query, symbols)
+    workers = workers or os.cpu_count()
+    split = min(len(symbols), (workers * PARTITIONS_PER_WORKER - 1).bit_length())
+    stop = multiprocessing.Event()
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(stop,)) as pool:
+        futures = [
+            pool.submit(_check_partition, knowledge, query, symbols, prefix)
+            for prefix in itertools.product((True, False), repeat=split)
+        ]
+        for future in as_completed(futures):
+            if future.result():
+                stop.set()
+                for pending in futures:
+                    pending.cancel()
+                return False
+    return True
+
+
+# Entailment checkers by name; all give the same answers
+ENGINES = {
+    "enumerate": model_check_enumerate,
+    "compiled": model_check_compiled,
+    "bitwise": model_check_bitwise,
+    "sat": model_check_sat,
+    "parallel": model_check_parallel,
+    "pruned": model_check_pruned,
+    "bdd": model_check_bdd,
+}
+
+
+def model_check(knowledge, query, engine="compiled", simplified=True):
+    """
+    Checks if knowledge base entails query, using the named engine, after
+    simplifying both unless `simplified` is False.
+    """
+    try:
+        check = ENGINES[engine]
+    except KeyError:
+        raise ValueError(f"unknown engine {engine!r}")
+    if simplified:
+        cache = dict()
+        knowledge, query = simplify(knowledge, cache), simplify(query, cache)
+    return check(knowledge, query)
+
+
+def model_check_many(knowledge, queries):
+    """
+    Returns a list of whether knowledge base entails each of `queries`,
+    finding the models of knowledge once for them all.
+
+    Up to one chunk of symbols, each chunk's mask of knowledge's models
+    is computed once and checked against every query still entailed;
+    beyond, a KnowledgeBase answers the queries in turn, reusing its
+    encoding, learned clauses and counter-models.
+    """
+    cache = dict()
+    knowledge = simplify(knowledge, cache)
+    queries = [simplify(query, cache) for query in queries]
+    symbols = sorted(knowledge.symbols().union(*[query.symbols() for query in queries]))
+    if len(symbols) > chunk_size(len(symbols)):
+        kb = KnowledgeBase(knowledge)
+        return [kb.entails(query) for query in queries]
+    models = compile_bits(knowledge)
+    checks = [compile_bits(query) for query in queries]
+    entailed = [True] * len(queries)
+    for masks, full in chunks(symbols):
+        known = models(masks, full)
+        for i, check in enumerate(checks):
+            if entailed[i]:
+                counter = known & (full ^ check(masks, full))
+                if counter.any() if hasattr(counter, "any") else counter:
+                    entailed[i] = False
+    return entailed
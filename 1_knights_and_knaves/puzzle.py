@@ -1,3 +1,16 @@
+"""
+Usage: python puzzle.py [DIRECTORY] [--workers N]
+
+Solves the puzzles below, or every puzzle file (*.txt, as written by
+generator.py) in DIRECTORY, in parallel across N worker processes.
+"""
+
+import argparse
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import generator
 from logic import *
 
 AKnight = Symbol("A is a Knight")
@@ -52,7 +65,36 @@ knowledge3 = And(
 )
 
 
+def solve(knowledge, symbols):
+    """Returns the symbols that knowledge entails."""
+    return [symbol for symbol, entailed in zip(symbols, model_check_many(knowledge, symbols))
+            if entailed]
+
+
+def solve_file(path):
+    """Returns the symbols that the puzzle in file `path` entails."""
+    with open(path) as f:
+        puzzle = generator.parse(f.read())
+    return solve(puzzle.knowledge, puzzle.symbols)
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Solves knights and knaves puzzles.")
+    parser.add_argument("directory", nargs="?", default=None,
+                        help="directory of puzzle files (default: the puzzles above)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    if args.directory is not None:
+        paths = sorted(glob.glob(os.path.join(args.directory, "*.txt")))
+        with ProcessPoolExecutor(args.workers) as pool:
+            for path, solution in zip(paths, pool.map(solve_file, paths)):
+                print(os.path.basename(path))
+                for symbol in solution:
+                    print(f"    {symbol}")
+        return
+
     symbols = [AKnight, AKnave, BKnight, BKnave, CKnight, CKnave]
     puzzles = [
         ("Puzzle 0", knowledge0),
@@ -65,9 +107,8 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
-            for symbol in symbols:
-                if model_check(knowledge, symbol):
-                    print(f"    {symbol}")
+            for symbol in solve(knowledge, symbols):
+                print(f"    {symbol}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+import generator
+from logic import count_models, model_check
+
+
+def test_solution_is_unique():
+    rng = random.Random(0)
+    for count in [1, 2, 3, 5]:
+        puzzle = generator.generate(count, rng=rng)
+        assert len(puzzle.symbols) == 2 * count
+        assert len(puzzle.statements) == 2 * count
+        assert count_models(puzzle.knowledge) == 1
+        for symbol in puzzle.symbols:
+            assert model_check(puzzle.knowledge, symbol, "bitwise") == (symbol in puzzle.solution)
+
+
+def test_same_seed_same_puzzle():
+    first = generator.generate(6, 9, random.Random(3))
+    second = generator.generate(6, 9, random.Random(3))
+    assert first.knowledge is second.knowledge
+    assert first.statements == second.statements
+
+
+def test_too_few_statements():
+    with pytest.raises(ValueError):
+        generator.generate(4, 0, random.Random(1), attempts=5)
+
+
+def test_names_beyond_alphabet():
+    names = generator.names(60)
+    assert names[:3] == ["A", "B", "C"]
+    assert names[26] == "A1" and names[59] == "H2"
+    assert len(set(names)) == 60
+
+
+def test_large_puzzle_solved_by_sat():
+    puzzle = generator.generate(40, rng=random.Random(2))
+    assert all(model_check(puzzle.knowledge, symbol, "sat") for symbol in puzzle.solution)
+
+
+def test_parse_reads_text_back():
+    puzzle = generator.generate(5, rng=random.Random(4))
+    parsed = generator.parse(generator.text(puzzle))
+    assert parsed.statements == puzzle.statements
+    assert set(parsed.symbols) == set(puzzle.symbols)
+    assert all(model_check(parsed.knowledge, symbol, "sat") for symbol in puzzle.solution)
+
+
+def test_parse_rejects_unknown_statements():
+    with pytest.raises(ValueError, match="line 2"):
+        generator.parse('A says "B is a knave."\nB says "A is a dragon."\n')
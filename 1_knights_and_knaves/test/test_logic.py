@@ -0,0 +1,755 @@
+import gc
+import itertools
+import pickle
+import random
+import sys
+
+import pytest
+
+import logic
+import puzzle
+from logic import (And, Biconditional, CNF, Implication, KnowledgeBase, Not, Or,
+                   Solver, Symbol, ENGINES, compile_sentence, int_masks, model_check,
+                   numpy_masks)
+
+"""
+Test suite for logic.py.
+
+Every entailment engine must agree with the reference enumeration of
+model_check_enumerate on the puzzles and on random sentences.
+"""
+
+A, B, C, D = (Symbol(name) for name in "ABCD")
+
+SOLUTIONS = {
+    "knowledge0": {"A is a Knave"},
+    "knowledge1": {"A is a Knave", "B is a Knight"},
+    "knowledge2": {"A is a Knave", "B is a Knight"},
+    "knowledge3": {"A is a Knight", "B is a Knave", "C is a Knight"},
+}
+
+
+def random_sentence(rng, symbols, depth):
+    """Returns a random sentence over `symbols`, at most `depth` deep."""
+    if depth == 0 or rng.random() < 0.2:
+        return rng.choice(symbols)
+    kind = rng.choice([Not, And, Or, Implication, Biconditional])
+    if kind is Not:
+        return Not(random_sentence(rng, symbols, depth - 1))
+    if kind in (And, Or):
+        return kind(*[random_sentence(rng, symbols, depth - 1)
+                      for _ in range(rng.randint(1, 3))])
+    return kind(random_sentence(rng, symbols, depth - 1),
+                random_sentence(rng, symbols, depth - 1))
+
+
+def random_pairs(count, seed=0):
+    """Returns (knowledge, query) pairs of random sentences."""
+    rng = random.Random(seed)
+    symbols = [A, B, C, D]
+    return [(random_sentence(rng, symbols, 4), random_sentence(rng, symbols, 2))
+            for _ in range(count)]
+
+
+# =============================================================================
+# Sentence tests
+# =============================================================================
+
+class TestSentence:
+    """Tests for hash-consed Sentence nodes"""
+
+    def test_equal_sentences_are_identical(self):
+        assert Symbol("A") is A
+        assert And(A, Or(B, Not(C))) is And(Symbol("A"), Or(B, Not(Symbol("C"))))
+        assert And(A, B) is not And(B, A)
+        assert And(A, B) is not Or(A, B)
+
+    def test_immutable(self):
+        sentence = And(A, B)
+        with pytest.raises(AttributeError):
+            sentence.conjuncts = (A,)
+        with pytest.raises(AttributeError):
+            A.name = "B"
+        with pytest.raises(AttributeError):
+            sentence.extra = 1
+
+    def test_add_returns_new_conjunction(self):
+        sentence = And(A)
+        extended = sentence.add(B)
+        assert extended is And(A, B)
+        assert sentence.conjuncts == (A,)
+
+    def test_symbols_cached(self):
+        sentence = Implication(And(A, B), Biconditional(C, Not(A)))
+        assert sentence.symbols() == {"A", "B", "C"}
+        assert sentence.symbols() is sentence.symbols()
+        assert And().symbols() == set()
+
+    def test_pickle_reinterns(self):
+        sentence = Biconditional(A, Or(B, Not(C)))
+        assert pickle.loads(pickle.dumps(sentence)) is sentence
+
+    def test_unused_sentences_are_freed(self):
+        key = (Not, Symbol("Z"))
+        Not(Symbol("Z"))
+        gc.collect()
+        assert key not in logic.Sentence.interned
+
+
+# =============================================================================
+# simplify() tests
+# =============================================================================
+
+def size(sentence):
+    """Returns how many nodes a sentence's tree has."""
+    children = {Not: lambda s: [s.operand], And: lambda s: s.conjuncts,
+                Or: lambda s: s.disjuncts, Implication: lambda s: [s.antecedent, s.consequent],
+                Biconditional: lambda s: [s.left, s.right]}
+    if isinstance(sentence, Symbol):
+        return 1
+    return 1 + sum(size(child) for child in children[type(sentence)](sentence))
+
+
+class TestSimplify:
+    """Tests for simplify()"""
+
+    def test_equivalent_and_no_larger(self):
+        names = ["A", "B", "C", "D"]
+        for sentence, _ in random_pairs(100, seed=10):
+            simplified = logic.simplify(sentence)
+            assert size(simplified) <= size(sentence)
+            for values in itertools.product((True, False), repeat=4):
+                model = dict(zip(names, values))
+                assert simplified.evaluate(model) == sentence.evaluate(model)
+
+    def test_flattens_and_deduplicates(self):
+        assert logic.simplify(And(A, And(B, And(A, C)), B)) is And(A, B, C)
+        assert logic.simplify(Or(Or(A), Or(B, A))) is Or(A, B)
+
+    def test_double_negation(self):
+        assert logic.simplify(Not(Not(Not(Not(A))))) is A
+
+    def test_constants(self):
+        TRUE, FALSE = logic.TRUE, logic.FALSE
+        assert logic.simplify(And(A, Not(A), B)) is FALSE
+        assert logic.simplify(Or(B, A, Not(A))) is TRUE
+        assert logic.simplify(And(A, Or(B, TRUE))) is A
+        assert logic.simplify(Implication(FALSE, B)) is TRUE
+        assert logic.simplify(Implication(A, FALSE)) is Not(A)
+        assert logic.simplify(Biconditional(A, Not(A))) is FALSE
+        assert logic.simplify(Biconditional(TRUE, Or(B, B))) is B
+
+    def test_absorption(self):
+        assert logic.simplify(And(A, Or(A, B))) is A
+        assert logic.simplify(Or(A, And(B, A))) is A
+
+    def test_puzzle_flattened(self):
+        simplified = logic.simplify(puzzle.knowledge3)
+        assert len(simplified.conjuncts) == 6
+
+    def test_model_check_unsimplified(self):
+        assert model_check(And(A, Or(B, Not(B))), A, simplified=False)
+
+
+# =============================================================================
+# compile_sentence() tests
+# =============================================================================
+
+class TestCompileSentence:
+    """Tests for compile_sentence()"""
+
+    def test_matches_evaluate(self):
+        """A compiled sentence agrees with evaluate() in every model."""
+        names = ["A", "B", "C", "D"]
+        for sentence, _ in random_pairs(50):
+            compiled = compile_sentence(sentence, names)
+            for values in itertools.product((True, False), repeat=len(names)):
+                model = dict(zip(names, values))
+                assert compiled(values) == sentence.evaluate(model)
+
+    def test_connectives(self):
+        """Each connective compiles to its truth table."""
+        f = compile_sentence(Implication(A, B), ["A", "B"])
+        assert [f(m) for m in [(True, True), (True, False), (False, True), (False, False)]] \
+            == [True, False, True, True]
+        f = compile_sentence(Biconditional(A, Not(B)), ["A", "B"])
+        assert f((True, False)) and not f((True, True))
+
+
+# =============================================================================
+# Bit-parallel evaluation tests
+# =============================================================================
+
+class TestBitwise:
+    """Tests for Sentence.bits() and model_check_bitwise()"""
+
+    def test_int_masks(self):
+        """Model j gives symbol i the value of bit i of j."""
+        masks, full = int_masks(3)
+        assert full == 0xFF
+        assert masks == [0b10101010, 0b11001100, 0b11110000]
+
+    def test_numpy_masks_match_int_masks(self):
+        np = pytest.importorskip("numpy")
+        masks, full = numpy_masks(8)
+        expected, _ = int_masks(8)
+        for mask, value in zip(masks, expected):
+            words = [int(word) for word in mask]
+            assert sum(word << (64 * i) for i, word in enumerate(words)) == value
+        assert full == np.uint64(2 ** 64 - 1)
+
+    def test_bits_match_evaluate(self):
+        """Bit j of a sentence's mask is its value in model j."""
+        names = ["A", "B", "C", "D"]
+        masks, full = int_masks(len(names))
+        masks = dict(zip(names, masks))
+        for sentence, _ in random_pairs(30):
+            bits = sentence.bits(masks, full)
+            for j in range(16):
+                model = {name: bool(j >> i & 1) for i, name in enumerate(names)}
+                assert bool(bits >> j & 1) == sentence.evaluate(model)
+
+    def test_int_chunks(self, monkeypatch):
+        """Symbols beyond a chunk are enumerated one chunk at a time."""
+        monkeypatch.setattr(logic, "INT_CHUNK_SYMBOLS", 2)
+        monkeypatch.setattr(logic, "np", None)
+        for knowledge, query in random_pairs(50, seed=2):
+            assert (logic.model_check_bitwise(knowledge, query)
+                    == model_check(knowledge, query, "compiled"))
+
+    def test_numpy_chunks(self, monkeypatch):
+        pytest.importorskip("numpy")
+        monkeypatch.setattr(logic, "INT_CHUNK_SYMBOLS", 0)
+        monkeypatch.setattr(logic, "NUMPY_CHUNK_SYMBOLS", 6)
+        rng = random.Random(3)
+        symbols = [Symbol(f"S{i}") for i in range(8)]
+        for _ in range(20):
+            knowledge = random_sentence(rng, symbols, 5)
+            query = random_sentence(rng, symbols, 2)
+            assert (logic.model_check_bitwise(knowledge, query)
+                    == model_check(knowledge, query, "compiled"))
+
+
+# =============================================================================
+# CNF and SAT solver tests
+# =============================================================================
+
+def satisfiable(clauses, count):
+    """Checks satisfiability by trying every assignment."""
+    return any(all(any(values[abs(literal) - 1] == (literal > 0) for literal in clause)
+                   for clause in clauses)
+               for values in itertools.product((True, False), repeat=count))
+
+
+class TestCNF:
+    """Tests for the Tseitin encoding"""
+
+    def test_literal_equivalent_to_sentence(self):
+        """Fixing the symbols, the sentence's literal takes its value."""
+        for sentence, _ in random_pairs(30, seed=4):
+            cnf = CNF()
+            literal = cnf.literal(sentence)
+            for values in itertools.product((True, False), repeat=4):
+                model = dict(zip("ABCD", values))
+                units = [[cnf.variable(name) if value else -cnf.variable(name)]
+                         for name, value in model.items()]
+                expected = sentence.evaluate(model)
+                solver = Solver(cnf.clauses + units)
+                assert solver.solve([literal]) == expected
+                assert solver.solve([-literal]) != expected
+
+    def test_shares_equal_subsentences(self):
+        cnf = CNF()
+        assert cnf.literal(And(A, Or(B, C))) == cnf.literal(And(A, Or(B, C)))
+        assert cnf.literal(Not(A)) == -cnf.variable("A")
+
+
+class TestSolver:
+    """Tests for the CDCL solver"""
+
+    def test_random_clauses(self):
+        """The solver agrees with brute force, and its models satisfy."""
+        rng = random.Random(5)
+        for _ in range(300):
+            count = rng.randint(1, 8)
+            clauses = [[rng.choice([-1, 1]) * rng.randint(1, count)
+                        for _ in range(rng.randint(1, 3))]
+                       for _ in range(rng.randint(1, 40))]
+            solver = Solver(clauses)
+            assert solver.solve() == satisfiable(clauses, count)
+            if solver.model:
+                assert all(any(solver.model[abs(literal)] == (literal > 0)
+                               for literal in clause) for clause in clauses)
+
+    def test_assumptions(self):
+        solver = Solver([[1, 2], [-1, 3]])
+        assert solver.solve([-3])
+        assert solver.model[2] and not solver.model[1]
+        assert not solver.solve([-3, -2])
+        assert solver.solve()
+
+    def test_incremental(self):
+        solver = Solver([[1, 2]])
+        assert solver.solve()
+        assert solver.add_clause([-1])
+        assert solver.solve() and solver.model[2]
+        assert not solver.add_clause([-2])
+        assert not solver.solve()
+
+    def test_pigeonhole(self):
+        """Five pigeons do not fit in four holes."""
+        def v(pigeon, hole):
+            return pigeon * 4 + hole + 1
+        clauses = [[v(p, h) for h in range(4)] for p in range(5)]
+        for h in range(4):
+            for p, q in itertools.combinations(range(5), 2):
+                clauses.append([-v(p, h), -v(q, h)])
+        assert not Solver(clauses).solve()
+
+    def test_many_symbols(self):
+        """Entailment over far more symbols than enumeration can handle."""
+        chain = [Symbol(f"P{i}") for i in range(200)]
+        knowledge = And(chain[0], *[Implication(p, q) for p, q in zip(chain, chain[1:])])
+        assert model_check(knowledge, chain[-1], "sat")
+        assert not model_check(knowledge, Not(chain[-1]), "sat")
+
+
+# =============================================================================
+# KnowledgeBase tests
+# =============================================================================
+
+class TestKnowledgeBase:
+    """Tests for KnowledgeBase"""
+
+    def test_queries_match_model_check(self):
+        for knowledge, query in random_pairs(100, seed=6):
+            kb = KnowledgeBase(knowledge)
+            for q in [query, Not(query), A, B]:
+                assert kb.entails(q) == model_check(knowledge, q, "enumerate")
+
+    def test_add_narrows_models(self):
+        kb = KnowledgeBase(Or(A, B))
+        assert not kb.entails(A)
+        assert not kb.entails(B)
+        kb.add(Not(B))
+        assert kb.entails(A)
+        assert not kb.entails(C)
+        kb.add(Implication(A, C))
+        assert kb.entails(C)
+        assert kb.entails(A)
+
+    def test_puzzle_solved_with_one_knowledge_base(self):
+        kb = KnowledgeBase(puzzle.knowledge3)
+        entailed = {symbol.name for symbol in
+                    [puzzle.AKnight, puzzle.AKnave, puzzle.BKnight,
+                     puzzle.BKnave, puzzle.CKnight, puzzle.CKnave]
+                    if kb.entails(symbol)}
+        assert entailed == SOLUTIONS["knowledge3"]
+
+    def test_contradiction_entails_anything(self):
+        kb = KnowledgeBase(A)
+        kb.add(Not(A))
+        assert kb.entails(B) and kb.entails(Not(B))
+
+
+# =============================================================================
+# Model counting and enumeration tests
+# =============================================================================
+
+def brute_force_models(knowledge, names):
+    """Returns the models of knowledge over `names`, as a sorted list."""
+    models = [dict(zip(names, values))
+              for values in itertools.product((True, False), repeat=len(names))]
+    return sorted([model for model in models if knowledge.evaluate(model)],
+                  key=lambda model: sorted(model.items()))
+
+
+class TestModels:
+    """Tests for count_models() and iter_models()"""
+
+    @pytest.fixture(params=["bitwise", "numpy", "search"])
+    def engine(self, request, monkeypatch):
+        """Runs a test with bit-parallel chunks, then with #SAT and search."""
+        if request.param == "numpy":
+            pytest.importorskip("numpy")
+            monkeypatch.setattr(logic, "INT_CHUNK_SYMBOLS", 0)
+            monkeypatch.setattr(logic, "NUMPY_CHUNK_SYMBOLS", 6)
+        if request.param == "search":
+            monkeypatch.setattr(logic, "np", None)
+            monkeypatch.setattr(logic, "INT_CHUNK_SYMBOLS", 2)
+        return request.param
+
+    def test_match_brute_force(self, engine):
+        for knowledge, _ in random_pairs(60, seed=9):
+            names = sorted(knowledge.symbols() | {"A", "B", "C", "D"})
+            expected = brute_force_models(knowledge, names)
+            assert logic.count_models(knowledge, "ABCD") == len(expected)
+            models = list(logic.iter_models(knowledge, [A, B, C, D]))
+            assert sorted(models, key=lambda model: sorted(model.items())) == expected
+
+    def test_puzzle_has_one_solution(self, engine):
+        assert logic.count_models(puzzle.knowledge3) == 1
+        (model,) = logic.iter_models(puzzle.knowledge3)
+        assert {name for name, value in model.items() if value} == SOLUTIONS["knowledge3"]
+
+    def test_extra_symbols_double_count(self, engine):
+        assert logic.count_models(Or(A, B)) == 3
+        assert logic.count_models(Or(A, B), ["C"]) == 6
+        assert logic.count_models(And(A, Not(A))) == 0
+        assert logic.count_models(Or(A, B), "CDEFGH") == 3 << 6
+        assert logic.count_models(And(), "ABCDEFGH") == 1 << 8
+        assert len(list(logic.iter_models(Or(A, B), "CDEFGH"))) == 3 << 6
+
+    def test_count_many_symbols(self):
+        """#SAT counts independent parts separately."""
+        symbols = [Symbol(f"P{i}") for i in range(60)]
+        knowledge = And(*[Or(p, q) for p, q in zip(symbols[::2], symbols[1::2])])
+        assert logic.count_models(knowledge) == 3 ** 30
+
+    def test_iter_models_is_lazy(self):
+        symbols = [Symbol(f"P{i}") for i in range(60)]
+        models = logic.iter_models(Or(*symbols))
+        first = next(models)
+        assert len(first) == 60 and any(first.values())
+
+    def test_partial_models_branch_beyond_recursion_limit(self):
+        """iter_models' search keeps its branches on a stack, not in frames."""
+        symbols = [Symbol(f"P{i:04}") for i in range(sys.getrecursionlimit() + 100)]
+        names = [symbol.name for symbol in symbols]
+        partials = [dict(model) for model in logic.partial_models(Or(*symbols), names)]
+        assert len(partials) == len(symbols)
+        assert partials[-1] == {name: name == names[-1] for name in names}
+
+
+# =============================================================================
+# Binary decision diagram tests
+# =============================================================================
+
+class TestBDD:
+    """Tests for BDD and DecisionDiagram"""
+
+    def test_equivalent_sentences_share_a_node(self):
+        bdd = logic.BDD()
+        assert bdd.diagram(Implication(A, B)) == bdd.diagram(Or(Not(A), B))
+        assert bdd.diagram(Biconditional(A, B)) == bdd.diagram(
+            And(Implication(A, B), Implication(B, A)))
+        assert bdd.diagram(And(A, Not(A))) == 0
+        assert bdd.diagram(Or(B, Not(B))) == 1
+
+    @pytest.mark.parametrize("ordering", sorted(logic.ORDERINGS))
+    def test_count_matches_count_models(self, ordering):
+        for knowledge, _ in random_pairs(40, seed=14):
+            diagram = logic.DecisionDiagram(knowledge, ordering)
+            assert diagram.count() == logic.count_models(knowledge)
+            assert diagram.count(["A", "B", "C", "D"]) == logic.count_models(knowledge, "ABCD")
+
+    def test_equivalent(self):
+        for knowledge, query in random_pairs(40, seed=15):
+            diagram = logic.DecisionDiagram(knowledge)
+            same = (model_check(knowledge, query, "enumerate")
+                    and model_check(query, knowledge, "enumerate"))
+            assert diagram.equivalent(query) == same
+            assert diagram.equivalent(Not(Not(knowledge)))
+
+    def test_orderings_list_every_symbol_once(self):
+        knowledge = puzzle.knowledge3
+        for order in logic.ORDERINGS.values():
+            assert sorted(order(knowledge)) == sorted(knowledge.symbols())
+
+    def test_unknown_ordering(self):
+        with pytest.raises(ValueError):
+            logic.DecisionDiagram(A, "random")
+
+    def test_node_limit(self):
+        chain = [Symbol(f"P{i}") for i in range(20)]
+        knowledge = And(*[Biconditional(p, q) for p, q in zip(chain, chain[1:])])
+        assert logic.DecisionDiagram(knowledge, max_nodes=1000).count() == 2
+        with pytest.raises(MemoryError):
+            logic.DecisionDiagram(knowledge, max_nodes=10)
+
+    def test_small_cache(self):
+        bdd = logic.BDD(cache_size=4)
+        for knowledge, query in random_pairs(20, seed=16):
+            entailed = bdd.apply("and", bdd.diagram(knowledge),
+                                 bdd.negate(bdd.diagram(query))) == 0
+            assert entailed == model_check(knowledge, query, "enumerate")
+        assert len(bdd.cache) <= 4
+
+
+# =============================================================================
+# Parallel model checking tests
+# =============================================================================
+
+class TestParallel:
+    """Tests for model_check_parallel()"""
+
+    def test_partitions_match_enumeration(self, monkeypatch):
+        """Checked across processes, even small sentences agree."""
+        monkeypatch.setattr(logic, "PARALLEL_MIN_SYMBOLS", 0)
+        for knowledge, query in random_pairs(5, seed=7):
+            for q in [query, Not(query)]:
+                assert (logic.model_check_parallel(knowledge, q, workers=2)
+                        == model_check(knowledge, q, "enumerate"))
+
+    def test_stops_at_first_counter_model(self, monkeypatch):
+        monkeypatch.setattr(logic, "PARALLEL_MIN_SYMBOLS", 0)
+        symbols = [Symbol(f"S{i}") for i in range(10)]
+        assert not logic.model_check_parallel(Or(*symbols), symbols[0], workers=2)
+        assert logic.model_check_parallel(And(*symbols), symbols[9], workers=2)
+
+
+# =============================================================================
+# Partial evaluation and pruning tests
+# =============================================================================
+
+class TestPruned:
+    """Tests for Sentence.partial() and model_check_pruned()"""
+
+    def test_partial_matches_completions(self):
+        """A partial value is the value of every completion of the model."""
+        names = ["A", "B", "C", "D"]
+        for sentence, _ in random_pairs(30, seed=8):
+            for assigned in itertools.product((True, False, None), repeat=4):
+                model = {name: value for name, value in zip(names, assigned)
+                         if value is not None}
+                free = [name for name in names if name not in model]
+                values = {sentence.evaluate({**model, **dict(zip(free, rest))})
+                          for rest in itertools.product((True, False), repeat=len(free))}
+                value = sentence.partial(model)
+                if value is not None:
+                    assert values == {value}
+                if not free:
+                    assert value is not None
+
+    def test_propagation_handles_long_chains(self):
+        """Unit propagation decides a 60 symbol chain without branching."""
+        chain = [Symbol(f"P{i}") for i in range(60)]
+        knowledge = And(chain[0], And(*[Implication(p, q) for p, q in zip(chain, chain[1:])]))
+        assert model_check(knowledge, chain[-1], "pruned")
+        assert not model_check(knowledge, Not(chain[-1]), "pruned")
+
+    def test_conjuncts_flattens_nested_ands(self):
+        assert logic.conjuncts(And(A, And(B, And(C)), Or(A, D))) == [A, B, C, Or(A, D)]
+
+
+# =============================================================================
+# Deep sentence tests
+# =============================================================================
+
+def deep_chain(length):
+    """Returns a sentence nesting Not and Implication `length` deep."""
+    sentence = A
+    for i in range(length):
+        sentence = Implication(B, sentence) if i % 2 else Not(sentence)
+    return sentence
+
+
+class TestDeep:
+    """Tests for sentences nested beyond the recursion limit"""
+
+    LENGTH = 5000
+
+    def test_evaluate_and_partial(self):
+        sentence = deep_chain(self.LENGTH)
+        # 10000 Nots cancel out, and B makes every implication hinge on A
+        assert sentence.evaluate({"A": True, "B": True})
+        assert not sentence.evaluate({"A": False, "B": True})
+        assert sentence.partial({"A": True, "B": True}) is True
+        assert sentence.partial({"A": True}) is None
+
+    def test_formula_and_repr(self):
+        sentence = deep_chain(self.LENGTH)
+        assert sentence.formula().startswith("B => (¬(B => (¬(")
+        assert repr(sentence).startswith("Implication(B, Not(Implication(B, ")
+
+    def test_pickle(self):
+        sentence = deep_chain(self.LENGTH)
+        assert pickle.loads(pickle.dumps(sentence)) is sentence
+
+    def test_compile_sentence(self):
+        sentence = deep_chain(self.LENGTH)
+        function = compile_sentence(sentence, ["A", "B"])
+        assert function((True, True)) and not function((False, True))
+
+    @pytest.mark.parametrize("engine", sorted(ENGINES))
+    def test_model_check(self, engine):
+        knowledge = And(B, deep_chain(self.LENGTH))
+        assert model_check(knowledge, A, engine)
+        assert not model_check(knowledge, Not(A), engine)
+
+    def test_wide_knowledge_compiles(self):
+        """Thousands of conjuncts are not chained into one deep expression."""
+        symbols = [Symbol(f"P{i}") for i in range(18)]
+        # A, or at most three of the symbols false: 3060 clauses
+        clauses = [Or(A, *combination) for combination in itertools.combinations(symbols, 4)]
+        knowledge = And(*clauses)
+        assert not model_check(knowledge, A, "bitwise")
+        assert model_check(knowledge, clauses[-1], "bitwise")
+        assert logic.model_check_many(knowledge, [A, clauses[0], Or(*symbols[:4])]) == [
+            False, True, False]
+        assert logic.count_models(knowledge) == (1 << 18) + 1 + 18 + 153 + 816
+        assert len(list(itertools.islice(logic.iter_models(knowledge), 10))) == 10
+
+    def test_partial_steps_agree(self):
+        """The iterative partial evaluation of deep sentences agrees with the recursive one."""
+        names = ["A", "B", "C", "D"]
+        for sentence, _ in random_pairs(30, seed=12):
+            for assigned in itertools.product((True, False, None), repeat=4):
+                model = {name: value for name, value in zip(names, assigned)
+                         if value is not None}
+                iterative = logic.fold(sentence, lambda node, values: node.settle(values, model))
+                assert iterative == sentence.kleene(model)
+
+
+# =============================================================================
+# Parsing and serialization tests
+# =============================================================================
+
+def has_short_junction(sentence):
+    """Checks for an And or Or of fewer than two parts, whose formula loses it."""
+    return any(isinstance(node, (And, Or)) and len(node.children()) < 2
+               for node in logic.postorder(sentence))
+
+
+class TestSerialization:
+    """Tests for parse_formula(), dumps() and loads()"""
+
+    def test_parse_formula_inverts_formula(self):
+        rng = random.Random(17)
+        symbols = [Symbol("A is a Knight"), B, Symbol("C d"), D]
+        for _ in range(300):
+            sentence = random_sentence(rng, symbols, 5)
+            parsed = logic.parse_formula(sentence.formula())
+            if has_short_junction(sentence):
+                assert logic.DecisionDiagram(sentence).equivalent(parsed)
+            else:
+                assert parsed is sentence
+
+    @pytest.mark.parametrize("sentence", [
+        logic.TRUE, logic.FALSE, And(A, logic.FALSE), Implication(A, logic.FALSE),
+        Not(logic.TRUE), Or(logic.TRUE, B), Biconditional(logic.TRUE, logic.FALSE),
+        And(Or(A, logic.TRUE), Not(Not(logic.FALSE))),
+    ])
+    def test_parse_formula_inverts_constants(self, sentence):
+        assert logic.parse_formula(sentence.formula()) is sentence
+
+    def test_parse_formula_precedence(self):
+        parse = logic.parse_formula
+        assert parse("A ∧ B ∧ C ∨ ¬D") is Or(And(A, B, C), Not(D))
+        assert parse("A => B => C") is Implication(A, Implication(B, C))
+        assert parse("A <=> B => C") is Biconditional(A, Implication(B, C))
+        assert parse("(A ∧ B) ∧ C") is And(And(A, B), C)
+        assert parse("¬¬A") is Not(Not(A))
+
+    def test_parse_formula_reprs(self):
+        parse = logic.parse_formula
+        assert parse("And()") is logic.TRUE and parse("Or()") is logic.FALSE
+        assert parse("Not(A) ∧ Implication(B, Or(C, D))") is And(Not(A), Implication(B, Or(C, D)))
+        assert parse(repr(puzzle.knowledge3)) is puzzle.knowledge3
+
+    @pytest.mark.parametrize("text", ["", "A ∧", "(A", "A)", "A, B", "A = B",
+                                      "And(A,)", "Implication(A)", "∨ A"])
+    def test_parse_formula_errors(self, text):
+        with pytest.raises(ValueError):
+            logic.parse_formula(text)
+
+    def test_parse_formula_deep(self):
+        sentence = deep_chain(TestDeep.LENGTH)
+        assert logic.parse_formula(sentence.formula()) is sentence
+
+    def test_dumps_loads(self):
+        for knowledge, query in random_pairs(100, seed=18):
+            assert logic.loads(logic.dumps(knowledge)) is knowledge
+        assert logic.loads(logic.dumps(logic.TRUE)) is logic.TRUE
+        sentence = deep_chain(TestDeep.LENGTH)
+        assert logic.loads(logic.dumps(sentence)) is sentence
+
+    def test_dumps_is_compact(self):
+        """Shared subsentences are written once, mostly in single bytes."""
+        shared = deep_chain(50)
+        knowledge = And(*[Or(shared, Symbol(f"P{i}")) for i in range(100)])
+        data = logic.dumps(knowledge)
+        assert len(data) < len(knowledge.formula()) / 20
+        gc.collect()
+        assert logic.loads(data) is knowledge
+
+    def test_loads_rejects_bad_data(self):
+        data = logic.dumps(puzzle.knowledge2)
+        for bad in [b"", b"pickle", data[:-1], data[:-1] + b"\x80", data + b"\x00"]:
+            with pytest.raises(ValueError):
+                logic.loads(bad)
+
+    def test_dump_load_file(self, tmp_path):
+        path = tmp_path / "knowledge.sdag"
+        with open(path, "wb") as f:
+            logic.dump(puzzle.knowledge3, f)
+        with open(path, "rb") as f:
+            assert logic.load(f) is puzzle.knowledge3
+
+
+# =============================================================================
+# model_check() tests
+# =============================================================================
+
+class TestModelCheck:
+    """Tests for model_check() and its engines"""
+
+    @pytest.mark.parametrize("engine", sorted(ENGINES))
+    def test_puzzles(self, engine):
+        """Every engine solves the four puzzles."""
+        symbols = [puzzle.AKnight, puzzle.AKnave, puzzle.BKnight,
+                   puzzle.BKnave, puzzle.CKnight, puzzle.CKnave]
+        for name, solution in SOLUTIONS.items():
+            knowledge = getattr(puzzle, name)
+            entailed = {symbol.name for symbol in symbols
+                        if model_check(knowledge, symbol, engine)}
+            assert entailed == solution
+
+    @pytest.mark.parametrize("engine", sorted(ENGINES))
+    def test_matches_enumeration(self, engine):
+        """Every engine agrees with the reference enumeration."""
+        for knowledge, query in random_pairs(100, seed=1):
+            assert (model_check(knowledge, query, engine)
+                    == model_check(knowledge, query, "enumerate"))
+
+    @pytest.mark.parametrize("engine", sorted(ENGINES))
+    def test_unsatisfiable_knowledge_entails_anything(self, engine):
+        """A contradiction entails every query."""
+        assert model_check(And(A, Not(A)), B, engine)
+
+    @pytest.mark.parametrize("engine", sorted(ENGINES))
+    def test_query_symbols_outside_knowledge(self, engine):
+        """A query about unconstrained symbols is not entailed."""
+        assert not model_check(Or(A, B), C, engine)
+        assert model_check(A, Or(A, C), engine)
+
+    def test_unknown_engine(self):
+        with pytest.raises(ValueError):
+            model_check(A, A, "oracle")
+
+
+class TestModelCheckMany:
+    """Tests for model_check_many() and solving puzzle files"""
+
+    def test_matches_model_check(self):
+        pairs = random_pairs(60, seed=13)
+        for knowledge, _ in pairs[:20]:
+            queries = [query for _, query in pairs]
+            assert (logic.model_check_many(knowledge, queries)
+                    == [model_check(knowledge, query, "enumerate") for query in queries])
+
+    def test_many_symbols(self):
+        """Beyond one chunk of symbols the queries go to a KnowledgeBase."""
+        chain = [Symbol(f"P{i}") for i in range(40)]
+        knowledge = And(chain[0], *[Implication(p, q) for p, q in zip(chain, chain[1:])])
+        queries = chain + [Not(chain[5]), Or(A, B), Implication(A, chain[3])]
+        assert logic.model_check_many(knowledge, queries) == [True] * 40 + [False, False, True]
+
+    def test_no_queries(self):
+        assert logic.model_check_many(A, []) == []
+
+    def test_solve_file(self, tmp_path):
+        path = tmp_path / "puzzle.txt"
+        path.write_text('A says "B and A are both knaves."\n')
+        solution = puzzle.solve_file(str(path))
+        assert {symbol.name for symbol in solution} == SOLUTIONS["knowledge1"]
@@ -1,5 +1,4 @@
-from typing import Set, Tuple
-import itertools
+from typing import Dict, List, Set, Tuple
 import random
 
 Cell = Tuple[int, int]
@@ -171,23 +170,108 @@ class MinesweeperAI():
         # List of sentences about the game known to be true
         self.knowledge = []
 
+        # Index of self.knowledge: each sentence's position in it, by id,
+        # and the sentences mentioning each cell, by id
+        self.indexed = self.knowledge
+        self.position: Dict[int, int] = {}
+        self.containing: Dict[Cell, Dict[int, Sentence]] = {}
+
+        # Sentences added or changed since inferences were last drawn
+        self.changed: Dict[int, Sentence] = {}
+
+    def sync_index(self):
+        """
+        Rebuilds the index if self.knowledge was reassigned or changed in
+        length other than through this class. Replacing or editing its
+        sentences in place is not noticed; call reindex after doing so.
+        """
+        if self.knowledge is not self.indexed or len(self.knowledge) != len(self.position):
+            self.reindex()
+
+    def reindex(self):
+        """
+        Rebuilds the index from self.knowledge and marks every sentence
+        as changed.
+        """
+        sentences = self.knowledge
+        self.knowledge = self.indexed = []
+        self.position = {}
+        self.containing = {}
+        for sentence in sentences:
+            self.add_sentence(sentence)
+
+    def add_sentence(self, sentence: Sentence):
+        """
+        Adds a sentence to the knowledge base and its index.
+        """
+        self.position[id(sentence)] = len(self.knowledge)
+        self.knowledge.append(sentence)
+        for cell in sentence.cells:
+            self.containing.setdefault(cell, {})[id(sentence)] = sentence
+        self.changed[id(sentence)] = sentence
+
+    def remove_sentence(self, sentence: Sentence):
+        """
+        Removes a sentence from the knowledge base and its index, moving
+        the last sentence into its place.
+        """
+        index = self.position.pop(id(sentence))
+        last = self.knowledge.pop()
+        if last is not sentence:
+            self.knowledge[index] = last
+            self.position[id(last)] = index
+        for cell in sentence.cells:
+            self.containing.get(cell, {}).pop(id(sentence), None)
+
+    def overlapping(self, sentence: Sentence) -> List[Sentence]:
+        """
+        Returns the other sentences in the knowledge base sharing a cell
+        with `sentence`.
+        """
+        found = {}
+        for cell in sentence.cells:
+            found.update(self.containing.get(cell, {}))
+        found.pop(id(sentence), None)
+        return list(found.values())
+
+    def is_known(self, sentence: Sentence) -> bool:
+        """
+        Checks if the knowledge base holds a sentence equal to `sentence`,
+        other than `sentence` itself.
+        """
+        cell = next(iter(sentence.cells))
+        return any(other == sentence and other is not sentence
+                   for other in self.containing.get(cell, {}).values())
+
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
         """
-        self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self.sync_index()
+        self.update_sentences(cell, self.mines, Sentence.mark_mine)
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
-        self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        self.sync_index()
+        self.update_sentences(cell, self.safes, Sentence.mark_safe)
+
+    def update_sentences(self, cell: Cell, known: Set[Cell], mark):
+        """
+        Adds `cell` to `known` (self.mines or self.safes) and applies `mark`
+        for it to the sentences mentioning it, found through the index,
+        marking them as changed. The index must be current.
+        """
+        known.add(cell)
+        sentences = self.containing.get(cell, {})
+        for key, sentence in list(sentences.items()):
+            mark(sentence, cell)
+            if cell not in sentence.cells:
+                del sentences[key]
+            self.changed[key] = sentence
 
     def remove_known_cells(self, cells: Set[Cell], count: int) -> Sentence:
         cells_mines = cells.intersection(self.mines)
@@ -201,43 +285,45 @@ class MinesweeperAI():
         if num_cells == 0:
             return False
         if num_cells == sentence.count:
-            for cell in sentence.cells:
-                self.mark_mine(cell)
+            for cell in list(sentence.cells):
+                self.update_sentences(cell, self.mines, Sentence.mark_mine)
         elif 0 == sentence.count:
-            for cell in sentence.cells:
-                self.mark_safe(cell)
-        elif sentence not in self.knowledge:
-            self.knowledge.append(sentence)
+            for cell in list(sentence.cells):
+                self.update_sentences(cell, self.safes, Sentence.mark_safe)
+        elif not self.is_known(sentence):
+            self.add_sentence(sentence)
         return True
 
     def reduce_kb(self):
-        while True:
-            sythesized_sentences = []
-            for s1, s2 in itertools.combinations(self.knowledge, 2):
-                if s1 < s2:
-                    sythesized_sentences.append(s2 - s1)
-                elif s2 < s1:
-                    sythesized_sentences.append(s1 - s2)
-
-            # Reduce sentences before adding
-            incorporated_new = []
-            for s in sythesized_sentences:
-                reduced_sentence = self.remove_known_cells(s.cells, s.count)
-                if reduced_sentence.cells:
-                    incorporated_new.append(self.incorporate_sentence(reduced_sentence))
-
-            # Add to knowledge, cleaning out empties and dupes
-            self.knowledge = list(set([s for s in self.knowledge if s.cells]))
-
-            # New info means we should make another pass; otherwise, reduction complete
-            if not any(incorporated_new):
-                break
-
-        # Reincorporate all knowledge to take account of reduced sentences (e.g., (i,j)=0)
-        saved_knowledge = self.knowledge
-        self.knowledge = []
-        for sentence in saved_knowledge:
-            self.incorporate_sentence(sentence)
+        """
+        Draws every inference from the sentences changed since the last
+        call, until none are left. A changed sentence that settles its
+        cells is replaced by marking them; otherwise it is compared, by
+        the subset method, with just the sentences sharing a cell with it,
+        so the work per move follows the part of the board that changed.
+        """
+        self.sync_index()
+        while self.changed:
+            key, sentence = self.changed.popitem()
+            if key not in self.position:
+                continue
+            if not sentence.cells or sentence.known_mines() or sentence.known_safes() \
+                    or self.is_known(sentence):
+                self.remove_sentence(sentence)
+                self.incorporate_sentence(sentence)
+                continue
+            for other in self.overlapping(sentence):
+                if key not in self.position:
+                    break
+                if id(other) not in self.position:
+                    continue
+                if other < sentence:
+                    derived = sentence - other
+                elif sentence < other:
+                    derived = other - sentence
+                else:
+                    continue
+                self.incorporate_sentence(self.remove_known_cells(derived.cells, derived.count))
 
     def add_knowledge(self, cell: Cell, count: int):
         """
@@ -754,3 +754,93 @@ class TestAddKnowledge:
         # (depends on implementation sophistication)
         # At minimum, all revealed cells should be tracked
         assert len(ai.moves_made) == 8
+
+
+# =============================================================================
+# Incremental inference tests
+# =============================================================================
+
+def check_index(ai):
+    """Checks that the AI's cell index describes exactly its knowledge."""
+    assert len(ai.position) == len(ai.knowledge)
+    for index, sentence in enumerate(ai.knowledge):
+        assert ai.position[id(sentence)] == index
+        for cell in sentence.cells:
+            assert ai.containing[cell][id(sentence)] is sentence
+    indexed = sum(len(sentences) for sentences in ai.containing.values())
+    assert indexed == sum(len(sentence.cells) for sentence in ai.knowledge)
+
+
+class TestIncrementalInference:
+    """Tests for the cell index behind MinesweeperAI.reduce_kb()"""
+
+    def play(self, height, width, mines, seed):
+        """Plays a game, safe moves first, checking the AI as it goes."""
+        import random
+        from minesweeper import Minesweeper
+        random.seed(seed)
+        game = Minesweeper(height, width, mines)
+        ai = MinesweeperAI(height, width)
+        while True:
+            move = ai.make_safe_move() or ai.make_random_move()
+            if move is None or game.is_mine(move):
+                return ai
+            ai.add_knowledge(move, game.nearby_mines(move))
+            check_index(ai)
+            assert all(game.is_mine(cell) for cell in ai.mines)
+            assert not any(game.is_mine(cell) for cell in ai.safes)
+            for sentence in ai.knowledge:
+                assert 0 < sentence.count < len(sentence.cells)
+            assert len(set(ai.knowledge)) == len(ai.knowledge)
+
+    def test_games_stay_sound_and_indexed(self):
+        for seed in range(10):
+            self.play(8, 8, 8, seed)
+
+    def test_expert_board(self):
+        ai = self.play(16, 30, 99, seed=3)
+        assert ai.moves_made
+
+    def test_only_overlapping_sentences_compared(self, monkeypatch):
+        """Sentences sharing no cell with a changed one are not examined."""
+        ai = MinesweeperAI(height=30, width=30)
+        for i in range(0, 30, 3):
+            for j in range(0, 30, 3):
+                ai.knowledge.append(Sentence({(i, j), (i, j + 1), (i + 1, j)}, 1))
+        ai.add_knowledge((29, 29), 1)
+        comparisons = []
+        original = Sentence.__lt__
+        monkeypatch.setattr(Sentence, "__lt__",
+                            lambda self, other: comparisons.append(1) or original(self, other))
+        ai.add_knowledge((0, 2), 1)
+        assert len(comparisons) < 20
+
+    def test_reassigned_knowledge_is_reindexed(self):
+        ai = MinesweeperAI(height=3, width=3)
+        ai.add_knowledge((0, 0), 1)
+        ai.knowledge = [Sentence({(2, 1), (2, 2)}, 1)]
+        ai.add_knowledge((1, 2), 1)
+        check_index(ai)
+        # {(0, 1), (0, 2), (1, 1), (2, 1), (2, 2)} = 1 less the assigned sentence
+        assert {(0, 1), (0, 2), (1, 1)} <= ai.safes
+
+    def test_replaced_sentence_is_reindexed(self):
+        ai = MinesweeperAI(height=3, width=4)
+        ai.add_knowledge((0, 0), 1)
+        ai.knowledge[0] = Sentence({(2, 2), (2, 3)}, 1)
+        ai.reindex()
+        ai.add_knowledge((1, 3), 1)
+        check_index(ai)
+        # {(0, 2), (0, 3), (1, 2), (2, 2), (2, 3)} = 1 less the new sentence
+        assert {(0, 2), (0, 3), (1, 2)} <= ai.safes
+
+    def test_edited_cells_are_reindexed(self):
+        ai = MinesweeperAI(height=3, width=4)
+        ai.add_knowledge((0, 0), 1)
+        sentence = ai.knowledge[0]
+        sentence.cells.clear()
+        sentence.cells.update({(2, 2), (2, 3)})
+        ai.reindex()
+        ai.add_knowledge((1, 3), 1)
+        check_index(ai)
+        assert {(0, 2), (0, 3), (1, 2)} <= ai.safes